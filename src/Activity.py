@@ -0,0 +1,176 @@
+import pandas as pd
+
+from src.GPSEvaluator import GPSEvaluator
+
+# parsed data from one gps file, with derived data calculated on demand & kept for reuse
+class Activity:
+
+    # derived columns mapped to (columns they are calculated from, function calculating them from a dataframe of those columns & the activity)
+    DERIVED={
+        "distance":(["position_lat","position_lon"],lambda df,activity:GPSEvaluator.distance(df,method=activity.distance_method)),
+        "cumm_distance":(["distance"],lambda df,activity:GPSEvaluator.cumm_distance(df)),
+        "seconds":(["time"],lambda df,activity:GPSEvaluator.time_to_seconds(df)),
+        "moving":(["distance","seconds"],lambda df,activity:GPSEvaluator.moving(df)),
+        "moving_seconds":(["distance","seconds"],lambda df,activity:GPSEvaluator.moving_seconds(df))
+    }
+
+    def __init__(self,df:pd.DataFrame,metadata=None,distance_method="vincenty"):
+        """
+        SUMMARY
+        Wraps a dataframe from GPSReader (or ActivityCache). Derived columns (see Activity.DERIVED), splits & histogram data are each calculated
+        the first time they are needed, from the quantities they depend on, and kept so they are never calculated twice.
+        Columns already in `df` (eg from ActivityCache) are used rather than recalculated. `df` is never modified.
+
+        PARAMETERS
+        df (pandas.DataFrame): dataframe of data produced by GPSReader.read()
+        metadata (dict): metadata produced by GPSReader.read() (default=None)
+        distance_method (str): distance model used for "distance", see GPSEvaluator.distance (default="vincenty")
+        """
+        self.df=df
+        self.metadata=metadata if (metadata is not None) else {}
+        self.distance_method=distance_method
+        self.__columns={} # derived columns
+        self.__results={} # (name,parameters) mapped to result
+
+    def column(self,name:str) -> pd.Series:
+        """
+        SUMMARY
+        A column of the activity's data, calculating it (and what it depends on) if it is derived & not yet known
+
+        PARAMETERS
+        name (str): name of column. one of the dataframe's columns or Activity.DERIVED
+
+        RETURNS
+        pandas.Series: values of column (None if insufficient data)
+        """
+        if name in self.df.columns: return self.df[name]
+        if name in self.__columns: return self.__columns[name]
+        if name not in self.DERIVED: return None
+
+        dependencies,calculate=self.DERIVED[name]
+        inputs=self.frame(dependencies)
+        values=calculate(inputs,self) if (inputs is not None) else None
+        self.__columns[name]=values # insufficient data is remembered too
+        return values
+
+    def frame(self,columns:[str]) -> pd.DataFrame:
+        """
+        SUMMARY
+        Dataframe of some of the activity's columns (see Activity.column). used to pass data to GPSEvaluator & SVGMaker
+
+        PARAMETERS
+        columns (list(str)): names of columns
+
+        RETURNS
+        pandas.DataFrame: requested columns (None if any column can't be found or calculated)
+        """
+        values={}
+        for name in columns:
+            values[name]=self.column(name)
+            if values[name] is None: return None
+        return pd.DataFrame(values,index=self.df.index)
+
+    def splits(self,split_dist=1000,moving=False) -> pd.DataFrame:
+        """
+        SUMMARY
+        Time taken for each split, see GPSEvaluator.splits
+
+        PARAMETERS
+        split_dist (int): length of split in metres (default=1000)
+        moving (bool): time only spent moving, see GPSEvaluator.moving_seconds (default=False)
+
+        RETURNS
+        pandas.DataFrame: "dist" & "time" of each split (None if insufficient data)
+        """
+        return self.__result(("splits",split_dist,moving),["cumm_distance","moving_seconds" if moving else "seconds"],lambda df:GPSEvaluator.splits(df,split_dist=split_dist,moving=moving))
+
+    def split_markers(self,split_dist=1000) -> pd.DataFrame:
+        """
+        SUMMARY
+        Position of the end of each split, see GPSEvaluator.split_markers
+
+        PARAMETERS
+        split_dist (int): length of split in metres (default=1000)
+
+        RETURNS
+        pandas.DataFrame: "dist", "position_lat" & "position_lon" of each split's end (None if insufficient data)
+        """
+        return self.__result(("split_markers",split_dist),["position_lat","position_lon","cumm_distance"],lambda df:GPSEvaluator.split_markers(df,split_dist=split_dist))
+
+    def best_efforts(self,distances=[400,1000,5000,10000,21097,42195]) -> pd.DataFrame:
+        """
+        SUMMARY
+        Fastest time taken to cover each distance, see GPSEvaluator.best_efforts
+
+        PARAMETERS
+        distances (list(float)): distances in metres (default=[400,1000,5000,10000,21097,42195])
+
+        RETURNS
+        pandas.DataFrame: "dist", "time", "start" & "end" of fastest window for each distance (None if insufficient data)
+        """
+        return self.__result(("best_efforts",tuple(distances)),["cumm_distance","seconds"],lambda df:GPSEvaluator.best_efforts(df,distances=distances))
+
+    def split_histogram_data(self,bin_width=10,sampling_dist=100,clean=False,moving=False) -> pd.Series:
+        """
+        SUMMARY
+        Histogram of split times, see GPSEvaluator.split_histogram_data. shares splits with Activity.split_histogram_data_per_km
+
+        PARAMETERS
+        bin_width (int): width of bin in seconds for seconds per km split (default=10)
+        sampling_dist (int): how often in metres to sample from the data set (default=100)
+        clean (bool): remove extreme data (default=False)
+        moving (bool): use time spent moving, see GPSEvaluator.moving_seconds (default=False)
+
+        RETURNS
+        pandas.Series: count of samples falling in each bin (None if insufficient data)
+        """
+        splits=self.splits(sampling_dist,moving)
+        if splits is None: return None
+        return self.__result(("split_histogram_data",bin_width,sampling_dist,clean,moving),[],
+                             lambda df:GPSEvaluator.split_histogram_data(None,bin_width=bin_width,sampling_dist=sampling_dist,clean=clean,splits=splits))
+
+    def split_histogram_data_per_km(self,bin_width=10,sampling_dist=100,clean=False,moving=False) -> pd.DataFrame:
+        """
+        SUMMARY
+        Histogram of split times for each km, see GPSEvaluator.split_histogram_data_per_km. shares splits with Activity.split_histogram_data
+
+        PARAMETERS
+        bin_width (int): width of bin in seconds for seconds per km split (default=10)
+        sampling_dist (int): how often in metres to sample from the data set (default=100)
+        clean (bool): remove extreme data (default=False)
+        moving (bool): use time spent moving, see GPSEvaluator.moving_seconds (default=False)
+
+        RETURNS
+        pandas.DataFrame: column for each km, row for each split (None if insufficient data)
+        """
+        splits=self.splits(sampling_dist,moving)
+        if splits is None: return None
+        return self.__result(("split_histogram_data_per_km",bin_width,sampling_dist,clean,moving),[],
+                             lambda df:GPSEvaluator.split_histogram_data_per_km(None,bin_width=bin_width,sampling_dist=sampling_dist,clean=clean,splits=splits))
+
+    def __result(self,key:tuple,columns:[str],calculate):
+        """
+        SUMMARY
+        Calculate a result the first time it is requested, & return the kept result afterwards
+
+        PARAMETERS
+        key (tuple): name of result & parameters it was calculated with
+        columns (list(str)): columns the result is calculated from
+        calculate (function): calculates result from a dataframe of `columns`
+
+        RETURNS
+        pandas.DataFrame/pandas.Series: copy of result, so callers can't change the kept result (None if insufficient data)
+        """
+        if key not in self.__results:
+            inputs=self.frame(columns)
+            self.__results[key]=calculate(inputs) if (inputs is not None) else None
+        result=self.__results[key]
+        return result.copy() if (result is not None) else None
+
+if __name__=="__main__":
+    from src.GPSReader import GPSReader
+    reader=GPSReader()
+    data,metadata=reader.read("../examples/example_ride.tcx",columnar=True)
+    activity=Activity(reader.data_to_dataframe(data),metadata)
+    print(activity.splits(1000))
+    print(activity.split_histogram_data(clean=True))
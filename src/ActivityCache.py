@@ -0,0 +1,240 @@
+from datetime import datetime
+import hashlib
+import json
+import numpy as np
+import os
+import pandas as pd
+import re
+import time
+
+from src.GPSReader import GPSReader
+from src.GPSEvaluator import GPSEvaluator
+
+# stores parsed activities on disk, so each gps file is only parsed once
+class ActivityCache:
+
+    INDEX="index.json" # name of file recording each entry's size & last use
+    ENTRY=re.compile(r"^[0-9a-f]{40}\.npz(\.tmp)?$") # name of entry files (see ActivityCache.key), so other files in `directory` are never removed
+    VERSION=2 # increase whenever the derived columns change, so they are recomputed
+
+    def __init__(self,directory=".activity_cache",max_bytes=256*2**20,hash_contents=False):
+        """
+        SUMMARY
+        Cache of parsed activities. Each activity is stored as a .npz file holding its columns (from GPSReader.read with columnar=True),
+        the "distance", "cumm_distance" & "seconds" columns from GPSEvaluator and its metadata.
+        The least recently used activities are removed once the cache holds more than `max_bytes`.
+        Every entry is removed when GPSReader.VERSION or ActivityCache.VERSION changes.
+
+        PARAMETERS
+        directory (str): path to directory to store cached activities in. created if it doesn't exist (default=".activity_cache")
+        max_bytes (int): maximum total size of cached activities in bytes (default=256MB)
+        hash_contents (bool): whether to identify files by a hash of their contents, rather than their path, size & modification time.
+                              slower, but entries survive files being moved or touched (default=False)
+        """
+        self.directory=directory
+        self.max_bytes=max_bytes
+        self.hash_contents=hash_contents
+        os.makedirs(directory,exist_ok=True)
+
+    def read(self,path:str,member=None) -> (pd.DataFrame,dict):
+        """
+        SUMMARY
+        Parsed data from a gps file, with derived columns. Read from the cache if present, otherwise parsed & then added to the cache.
+
+        PARAMETERS
+        path (str): path to file to read (see GPSReader.read)
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+
+        RETURNS
+        pandas.DataFrame: data from GPSReader.read, with "distance", "cumm_distance" & "seconds" columns (where data allows)
+        dict: metadata (see GPSReader.read)
+        -1,-1 if file type is unsupported
+        """
+        key=self.key(path,member)
+        index=self.__load_index()
+        entry_path=os.path.join(self.directory,key+".npz")
+
+        if key in index["entries"] and os.path.exists(entry_path):
+            df,metadata=self.__load_entry(entry_path)
+            index["entries"][key]["used"]=time.time()
+            self.__evict(index) # in case `max_bytes` has been reduced
+            self.__save_index(index)
+            return df,metadata
+
+        reader=GPSReader()
+        columns,metadata=reader.read(path,columnar=True,member=member)
+        if columns==-1: return -1,-1 # unsupported file type
+
+        df=reader.columns_to_dataframe(columns)
+        for name,evaluate in (("distance",GPSEvaluator.distance),("cumm_distance",GPSEvaluator.cumm_distance),("seconds",GPSEvaluator.time_to_seconds)):
+            values=evaluate(df) if len(df)>0 else None
+            if values is not None: df[name]=values
+
+        self.__save_entry(entry_path,df,metadata)
+        index["entries"][key]={"bytes":os.path.getsize(entry_path),"used":time.time()}
+        self.__evict(index)
+        self.__save_index(index)
+        return df,metadata
+
+    def key(self,path:str,member=None) -> str:
+        """
+        SUMMARY
+        Name identifying the entry for a file
+
+        PARAMETERS
+        path (str): path to gps file
+        member (str): name of file inside .zip archive at `path` (default=None)
+
+        RETURNS
+        str: hex digest of file's path, size & modification time (or its contents if `hash_contents`), `member` & versions
+        """
+        digest=hashlib.sha1()
+        if self.hash_contents:
+            with open(path,"rb") as f:
+                for block in iter(lambda:f.read(1<<20),b""): digest.update(block)
+        else:
+            stat=os.stat(path)
+            digest.update("{}|{}|{}".format(os.path.abspath(path),stat.st_size,stat.st_mtime_ns).encode())
+        digest.update("|{}|{}".format(member,self.__version()).encode())
+        return digest.hexdigest()
+
+    def invalidate(self,path:str,member=None):
+        """
+        SUMMARY
+        Remove the entry for a file, if cached
+
+        PARAMETERS
+        path (str): path to gps file
+        member (str): name of file inside .zip archive at `path` (default=None)
+        """
+        index=self.__load_index()
+        self.__remove(index,self.key(path,member))
+        self.__save_index(index)
+
+    def clear(self):
+        """
+        SUMMARY
+        Remove every entry
+        """
+        index=self.__load_index()
+        for key in list(index["entries"]): self.__remove(index,key)
+        self.__save_index(index)
+
+    """
+    ENTRIES
+    """
+
+    def __save_entry(self,entry_path:str,df:pd.DataFrame,metadata:dict):
+        """
+        SUMMARY
+        Write parsed data to a .npz file. written to a temporary file first, so a partly written entry is never read.
+
+        PARAMETERS
+        entry_path (str): path to .npz file
+        df (pandas.DataFrame): parsed data (see ActivityCache.read)
+        metadata (dict): metadata (see GPSReader.read)
+        """
+        arrays={"column_"+name:(df[name].values.view(np.int64) if name=="time" else df[name].values) for name in df.columns}
+        metadata={name:(value.isoformat() if isinstance(value,datetime) else value) for name,value in metadata.items()}
+        arrays["metadata"]=np.array(json.dumps(metadata))
+
+        temp_path=entry_path+".tmp"
+        with open(temp_path,"wb") as f: np.savez(f,**arrays)
+        os.replace(temp_path,entry_path)
+
+    def __load_entry(self,entry_path:str) -> (pd.DataFrame,dict):
+        """
+        SUMMARY
+        Read parsed data from a .npz file written by ActivityCache.__save_entry
+
+        PARAMETERS
+        entry_path (str): path to .npz file
+
+        RETURNS
+        pandas.DataFrame: parsed data (see ActivityCache.read)
+        dict: metadata (see GPSReader.read)
+        """
+        with np.load(entry_path,allow_pickle=False) as arrays:
+            columns={name[len("column_"):]:arrays[name] for name in arrays.files if name.startswith("column_")}
+            metadata=json.loads(str(arrays["metadata"]))
+        if "date" in metadata: metadata["date"]=datetime.fromisoformat(metadata["date"])
+        return GPSReader().columns_to_dataframe(columns),metadata
+
+    """
+    INDEX
+    """
+
+    def __load_index(self) -> dict:
+        """
+        SUMMARY
+        Read the size & last use of each entry. every entry is removed if it was written by a different GPSReader.VERSION or ActivityCache.VERSION.
+        only files named like entries are removed, other files in `directory` are left alone.
+
+        RETURNS
+        dict: "version" (str): see ActivityCache.__version
+              "entries" (dict(str:dict)): "bytes" (size of entry) & "used" (time of last use) of each entry, keyed by ActivityCache.key
+        """
+        index_path=os.path.join(self.directory,self.INDEX)
+        index={"version":self.__version(),"entries":{}}
+        if os.path.exists(index_path):
+            with open(index_path) as f: stored=json.load(f)
+            if stored.get("version")==self.__version(): return stored
+
+        for name in os.listdir(self.directory): # reader has changed (or index is missing), so nothing cached can be trusted
+            if self.ENTRY.match(name): os.remove(os.path.join(self.directory,name))
+        return index
+
+    def __version(self) -> str:
+        """
+        SUMMARY
+        Version of parsed data & derived columns. entries with a different version are never read
+
+        RETURNS
+        str: GPSReader.VERSION & ActivityCache.VERSION
+        """
+        return "{}.{}".format(GPSReader.VERSION,self.VERSION)
+
+    def __save_index(self,index:dict):
+        """
+        SUMMARY
+        Write index from ActivityCache.__load_index
+
+        PARAMETERS
+        index (dict): see ActivityCache.__load_index
+        """
+        index_path=os.path.join(self.directory,self.INDEX)
+        with open(index_path+".tmp","w") as f: json.dump(index,f)
+        os.replace(index_path+".tmp",index_path)
+
+    def __evict(self,index:dict):
+        """
+        SUMMARY
+        Remove least recently used entries until the cache holds at most `max_bytes`
+
+        PARAMETERS
+        index (dict): see ActivityCache.__load_index
+        """
+        entries=index["entries"]
+        total=sum(entry["bytes"] for entry in entries.values())
+        for key in sorted(entries,key=lambda key:entries[key]["used"]):
+            if total<=self.max_bytes: break
+            total-=entries[key]["bytes"]
+            self.__remove(index,key)
+
+    def __remove(self,index:dict,key:str):
+        """
+        SUMMARY
+        Remove an entry
+
+        PARAMETERS
+        index (dict): see ActivityCache.__load_index
+        key (str): see ActivityCache.key
+        """
+        index["entries"].pop(key,None)
+        entry_path=os.path.join(self.directory,key+".npz")
+        if os.path.exists(entry_path): os.remove(entry_path)
+
+if __name__=="__main__":
+    cache=ActivityCache()
+    df,metadata=cache.read("../examples/example_ride.tcx")
+    print(df.head())
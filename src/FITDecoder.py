@@ -0,0 +1,249 @@
+from array import array
+import numpy as np
+
+"""
+FIT is the binary format recorded by Garmin (and most other) devices.
+Specification: https://developer.garmin.com/fit/protocol/
+"""
+
+NAT=np.iinfo(np.int64).min # int64 value of numpy.datetime64("NaT"), marks a missing time
+
+# decodes .fit files into the same columns as GPSReader.read_gpx_columns & GPSReader.read_tcx_columns
+class FITDecoder:
+
+    FIT_EPOCH=631065600 # seconds between 1970-01-01T00:00:00Z and 1989-12-31T00:00:00Z (the FIT epoch)
+
+    # base type number mapped to (numpy type, invalid value)
+    BASE_TYPES={
+        0x00:("u1",0xFF),0x01:("i1",0x7F),0x02:("u1",0xFF),0x0A:("u1",0),0x0D:("u1",0xFF),
+        0x83:("i2",0x7FFF),0x84:("u2",0xFFFF),0x8B:("u2",0),
+        0x85:("i4",0x7FFFFFFF),0x86:("u4",0xFFFFFFFF),0x8C:("u4",0),
+        0x8E:("i8",0x7FFFFFFFFFFFFFFF),0x8F:("u8",0xFFFFFFFFFFFFFFFF),0x90:("u8",0),
+        0x88:("f4",None),0x89:("f8",None) # invalid floats are NaN
+    }
+
+    # global message numbers
+    FILE_ID=0; SPORT=12; SESSION=18; RECORD=20
+    TIMESTAMP=253 # field number of timestamp, common to all messages
+
+    # field number of record message mapped to (column name, scale, offset). value=raw/scale-offset
+    RECORD_FIELDS={
+        0:("position_lat",2**31/180,0), # semicircles to degrees
+        1:("position_lon",2**31/180,0),
+        2:("altitude",5,500),
+        78:("enhanced_altitude",5,500),
+        3:("heart_rate",1,0),
+        4:("cadence",1,0),
+        5:("distance_to_point",100,0),
+        7:("power",1,0),
+        13:("temperature",1,0)
+    }
+
+    SPORTS={1:"Running",2:"Cycling",5:"Swimming",11:"Walking",17:"Hiking"}
+
+    def decode(self,buf,columns=None) -> (dict,dict):
+        """
+        SUMMARY
+        decode the record messages of a .fit file into a numpy array per field.
+        the file is walked once to find where each message is. each field is then read for every message at once, as a numpy record array.
+        developer fields and lap & length messages are skipped.
+
+        PARAMETERS
+        buf (bytes/mmap.mmap): contents of .fit file
+        columns (list(str)): names of fields to decode, other fields are skipped. pass `None` for every field (default=None)
+
+        RETURNS
+        dict(str:numpy.ndarray): values of each field, one entry per record message
+                                 fields include ["position_lat":float64,"position_lon":float64,"altitude":float64,"time":int64 (epoch nanoseconds),
+                                                 "heart_rate":float64,"cadence":float64,"power":float64,"distance_to_point":float64,"temperature":float64]
+                                 missing values are NaN (or NAT for "time"). fields missing from every reading are dropped.
+        dict: metadata
+              fields include ["sport":str,"date":int (epoch nanoseconds)]
+        """
+        data=np.frombuffer(buf,dtype=np.uint8)
+        layouts=self.__find_messages(buf)
+
+        requested=lambda name:(columns is None) or (name in columns) or (name=="enhanced_altitude" and "altitude" in columns)
+        field_numbers=[num for num,(name,_,_) in self.RECORD_FIELDS.items() if requested(name)]
+        records=self.__read_fields(data,layouts,self.RECORD,field_numbers)
+        decoded={}
+        for num in field_numbers:
+            name,scale,offset=self.RECORD_FIELDS[num]
+            if num in records: decoded[name]=records[num]/scale-offset
+        if "enhanced_altitude" in decoded: # higher resolution altitude, when recorded
+            enhanced=decoded.pop("enhanced_altitude")
+            decoded["altitude"]=np.where(np.isnan(enhanced),decoded["altitude"],enhanced) if "altitude" in decoded else enhanced
+        if requested("time"):
+            times=self.__times(data,layouts)
+            if len(times)>0: decoded["time"]=times
+        decoded={name:values for name,values in decoded.items() if ((values!=NAT).any() if name=="time" else not np.isnan(values).all())}
+
+        metadata={}
+        file_id=self.__read_fields(data,layouts,self.FILE_ID,[4]) # field 4 is time_created
+        created=file_id[4][~np.isnan(file_id[4])] if 4 in file_id else []
+        if len(created)>0: metadata["date"]=(int(created[0])+self.FIT_EPOCH)*10**9
+        for message,field in ((self.SESSION,5),(self.SPORT,0)): # sport is in session or sport message
+            sport=self.__read_fields(data,layouts,message,[field])
+            sport=sport[field][~np.isnan(sport[field])] if field in sport else []
+            if len(sport)>0:
+                metadata["sport"]=self.SPORTS.get(int(sport[0]),int(sport[0]))
+                break
+
+        return decoded,metadata
+
+    def __find_messages(self,buf) -> list:
+        """
+        SUMMARY
+        walk the records of a .fit file (or several chained .fit files), recording where each data message starts.
+        only record headers & definition messages are read here. a truncated file (eg an interrupted recording) is read up to its last whole message.
+
+        PARAMETERS
+        buf (bytes/mmap.mmap): contents of .fit file
+
+        RETURNS
+        list(dict): layout of each definition message. keys are
+                    "global" (int): global message number
+                    "fields" (list((int,int,int,int))): (field number, offset, size, base type) of each field
+                    "endian" (str): "<" or ">"
+                    "size" (int): size of each message's content in bytes
+                    "order" (array): position of each message using this layout amongst all data messages
+                    "starts" (array): offset of each message's content in `buf`
+                    "time_offsets" (array): time offset of each message with a compressed timestamp header (-1 for normal headers)
+        """
+        layouts=[]; local_layouts={}
+        pos=0; count=0
+        while pos+12<=len(buf):
+            header_size=buf[pos]
+            if buf[pos+8:pos+12]!=b".FIT": raise ValueError("not a FIT file")
+            data_size=int.from_bytes(buf[pos+4:pos+8],"little")
+            pos+=header_size; end=min(pos+data_size,len(buf))
+
+            while pos<end:
+                header=buf[pos]; pos+=1
+                if header&0x80: # compressed timestamp header
+                    local=(header>>5)&0x03; time_offset=header&0x1F
+                elif header&0x40: # definition message
+                    if pos+5>end or pos+5+3*buf[pos+4]>end: return layouts # truncated
+                    endian=">" if buf[pos+1]==1 else "<"
+                    global_number=int.from_bytes(buf[pos+2:pos+4],"big" if endian==">" else "little")
+                    num_fields=buf[pos+4]
+                    fields=[]; size=0
+                    for i in range(num_fields):
+                        num,field_size,base=buf[pos+5+3*i:pos+8+3*i]
+                        fields.append((num,size,field_size,base)); size+=field_size
+                    pos+=5+3*num_fields
+                    if header&0x20: # developer fields (skipped)
+                        if pos+1>end or pos+1+3*buf[pos]>end: return layouts # truncated
+                        num_dev_fields=buf[pos]
+                        size+=sum(buf[pos+2+3*i] for i in range(num_dev_fields))
+                        pos+=1+3*num_dev_fields
+                    local_layouts[header&0x0F]=len(layouts)
+                    layouts.append({"global":global_number,"fields":fields,"endian":endian,"size":size,"order":array("q"),"starts":array("q"),"time_offsets":array("q")})
+                    continue
+                else: # data message
+                    local=header&0x0F; time_offset=-1
+
+                if local not in local_layouts: raise ValueError("FIT data message uses undefined local message type {} at byte {}".format(local,pos-1))
+                layout=layouts[local_layouts[local]]
+                if pos+layout["size"]>end: return layouts # truncated
+                layout["order"].append(count); layout["starts"].append(pos); layout["time_offsets"].append(time_offset)
+                pos+=layout["size"]; count+=1
+
+            pos=end+2 # skip crc
+        return layouts
+
+    def __read_fields(self,data:np.ndarray,layouts:list,global_number:int,field_numbers:[int]) -> dict:
+        """
+        SUMMARY
+        read fields from every message of a given type. each layout's messages are viewed as a numpy record array, so no message is read individually.
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of .fit file
+        layouts (list(dict)): from FITDecoder.__find_messages
+        global_number (int): global message number
+        field_numbers (list(int)): field numbers to read
+
+        RETURNS
+        dict(int:numpy.ndarray): float64 values of each field (which any message has), in the order messages appear. invalid values are NaN
+        """
+        layouts=[layout for layout in layouts if layout["global"]==global_number and len(layout["starts"])>0]
+        if len(layouts)==0: return {}
+
+        order=np.concatenate([np.frombuffer(layout["order"],dtype=np.int64) for layout in layouts])
+        sort=np.argsort(order,kind="stable")
+        fields={}
+        for num in field_numbers:
+            parts=[]; found=False
+            for layout in layouts:
+                values=self.__read_field(data,layout,num)
+                found|=values is not None
+                parts.append(values if values is not None else np.full(len(layout["starts"]),np.nan))
+            if found: fields[num]=np.concatenate(parts)[sort]
+        return fields
+
+    def __read_field(self,data:np.ndarray,layout:dict,num:int) -> np.ndarray:
+        """
+        SUMMARY
+        read one field from every message with a given layout
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of .fit file
+        layout (dict): from FITDecoder.__find_messages
+        num (int): field number
+
+        RETURNS
+        numpy.ndarray: float64 value of field for each message. invalid values are NaN
+                       (None if layout doesn't include field)
+        """
+        field=[field for field in layout["fields"] if field[0]==num]
+        if len(field)==0 or field[0][3] not in self.BASE_TYPES: return None
+        _,offset,size,base=field[0]
+        numpy_type,invalid=self.BASE_TYPES[base]
+        dtype=np.dtype(layout["endian"]+numpy_type)
+        if size!=dtype.itemsize: return None # arrays are not supported
+
+        starts=np.frombuffer(layout["starts"],dtype=np.int64)
+        rows=data[(starts+offset)[:,None]+np.arange(size)]
+        raw=np.ascontiguousarray(rows).view(dtype).ravel()
+        values=raw.astype(np.float64)
+        if invalid is not None: values[raw==invalid]=np.nan
+        return values
+
+    def __times(self,data:np.ndarray,layouts:list) -> np.ndarray:
+        """
+        SUMMARY
+        time of each record message.
+        messages with a compressed timestamp header only store the last 5 bits of their time, relative to the last full timestamp of any message.
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of .fit file
+        layouts (list(dict)): from FITDecoder.__find_messages
+
+        RETURNS
+        numpy.ndarray: int64 nanoseconds since the unix epoch for each record message (NAT if unknown)
+        """
+        orders=[]; timestamps=[]; offsets=[]; is_record=[]
+        for layout in layouts:
+            if len(layout["starts"])==0: continue
+            time_offsets=np.frombuffer(layout["time_offsets"],dtype=np.int64)
+            values=self.__read_field(data,layout,self.TIMESTAMP)
+            if values is None: values=np.full(len(time_offsets),np.nan)
+            orders.append(np.frombuffer(layout["order"],dtype=np.int64)); timestamps.append(values); offsets.append(time_offsets)
+            is_record.append(np.full(len(time_offsets),layout["global"]==self.RECORD))
+        if len(orders)==0: return np.empty(0,dtype=np.int64)
+
+        sort=np.argsort(np.concatenate(orders),kind="stable")
+        timestamps=np.concatenate(timestamps)[sort]; offsets=np.concatenate(offsets)[sort]; is_record=np.concatenate(is_record)[sort]
+
+        compressed=np.flatnonzero(offsets>=0)
+        if len(compressed)>0: # resolve compressed timestamps in order (each is relative to the previous)
+            last=None
+            for i in np.flatnonzero((offsets>=0)|~np.isnan(timestamps)).tolist():
+                if offsets[i]<0: last=int(timestamps[i]); continue
+                if last is None: continue
+                time=(last&~0x1F)+int(offsets[i])
+                if offsets[i]<(last&0x1F): time+=0x20 # offset rolled over
+                timestamps[i]=last=time
+
+        times=timestamps[is_record]
+        return np.where(np.isnan(times),NAT,(np.nan_to_num(times).astype(np.int64)+self.FIT_EPOCH)*10**9)
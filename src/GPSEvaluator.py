@@ -1,11 +1,15 @@
 
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from math import floor
+import os
 import sys
+import time
 
 from geopy.distance import geodesic
-from src.GPSReader import GPSReader
+from src import Kernels
+from src.GPSReader import GPSReader,NAT
 
 # Evlauates data generated by GPSReader
 class GPSEvaluator:
@@ -13,24 +17,138 @@ class GPSEvaluator:
     """
     HELPERS
     """
-    def __distance_lat_lon(p1,p2) -> float:
+    # WGS-84 ellipsoid, as used by geopy.distance.geodesic
+    WGS84_A=6378137.0 # semi-major axis in metres
+    WGS84_F=1/298.257223563 # flattening
+    WGS84_B=(1-WGS84_F)*WGS84_A # semi-minor axis in metres
+    EARTH_RADIUS=6371008.8 # mean radius in metres, used by spherical models
+
+    # implementations of sequential kernels (hysteresis & best efforts). "numba" is used when installed (see Kernels)
+    BACKENDS=["numpy"]+(["numba"] if Kernels.AVAILABLE else [])
+    backend=BACKENDS[-1]
+
+    def set_backend(name:str):
+        """
+        SUMMARY
+        Choose the implementation of sequential kernels, eg to compare their speed. results are the same with either backend
+
+        PARAMETERS
+        name (str): one of GPSEvaluator.BACKENDS. "numpy" (always available) or "numba" (if numba is installed)
+        """
+        if name not in GPSEvaluator.BACKENDS: raise ValueError("unavailable backend {}, use one of {}".format(name,GPSEvaluator.BACKENDS))
+        GPSEvaluator.backend=name
+
+    def __geodesic_lat_lon(lat1:np.ndarray,lon1:np.ndarray,lat2:np.ndarray,lon2:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        returns the distance in metres between each pair of lat-lon co-ordinates, using geopy.distance.geodesic for each pair.
+        exact (to nanometres) but slow.
+
+        PARAMETERS
+        lat1 (numpy.ndarray): latitude of first point of each pair (degrees)
+        lon1 (numpy.ndarray): longitude of first point of each pair (degrees)
+        lat2 (numpy.ndarray): latitude of second point of each pair (degrees)
+        lon2 (numpy.ndarray): longitude of second point of each pair (degrees)
+
+        RETURNS
+        numpy.ndarray: distance in metres between each pair of points (NaN if any co-ordinate is NaN)
+        """
+        missing=np.isnan(lat1)|np.isnan(lon1)|np.isnan(lat2)|np.isnan(lon2)
+        distances=np.full(len(lat1),np.nan)
+        for i in np.flatnonzero(~missing): distances[i]=geodesic((lat1[i],lon1[i]),(lat2[i],lon2[i])).meters
+        return distances
+
+    def __equirectangular_lat_lon(lat1:np.ndarray,lon1:np.ndarray,lat2:np.ndarray,lon2:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        returns the distance in metres between each pair of lat-lon co-ordinates, treating the sphere as flat between them.
+        fastest model. error is under 0.5% for consecutive readings (see GPSEvaluator.compare_distance_methods).
+
+        PARAMETERS
+        see GPSEvaluator.__geodesic_lat_lon
+
+        RETURNS
+        numpy.ndarray: distance in metres between each pair of points (NaN if any co-ordinate is NaN)
+        """
+        lat1,lon1,lat2,lon2=np.radians(lat1),np.radians(lon1),np.radians(lat2),np.radians(lon2)
+        x=(lon2-lon1)*np.cos((lat1+lat2)/2)
+        return GPSEvaluator.EARTH_RADIUS*np.hypot(x,lat2-lat1)
+
+    def __haversine_lat_lon(lat1:np.ndarray,lon1:np.ndarray,lat2:np.ndarray,lon2:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        returns the great-circle distance in metres between each pair of lat-lon co-ordinates, on a sphere.
+        error is under 0.5% as the earth isn't a sphere (see GPSEvaluator.compare_distance_methods).
+
+        PARAMETERS
+        see GPSEvaluator.__geodesic_lat_lon
+
+        RETURNS
+        numpy.ndarray: distance in metres between each pair of points (NaN if any co-ordinate is NaN)
+        """
+        lat1,lon1,lat2,lon2=np.radians(lat1),np.radians(lon1),np.radians(lat2),np.radians(lon2)
+        h=np.sin((lat2-lat1)/2)**2+np.cos(lat1)*np.cos(lat2)*np.sin((lon2-lon1)/2)**2
+        return 2*GPSEvaluator.EARTH_RADIUS*np.arcsin(np.sqrt(np.minimum(h,1)))
+
+    def __vincenty_lat_lon(lat1:np.ndarray,lon1:np.ndarray,lat2:np.ndarray,lon2:np.ndarray) -> np.ndarray:
         """
         SUMMARY
-        returns the euclidean (2D) distance in metres between two lat-lon co-ordinates
+        returns the distance in metres between each pair of lat-lon co-ordinates, along the WGS-84 ellipsoid.
+        uses Vincenty's inverse formula on whole arrays. it is within 1mm of geopy.distance.geodesic for points less than 1000km apart.
+        the few pairs for which the formula doesn't converge (nearly antipodal points) use geopy.distance.geodesic.
 
         PARAMETERS
-        p1 ((float,float)): position one (lat,lon)
-        p2 ((float,float)): position two (lat,lon)
+        see GPSEvaluator.__geodesic_lat_lon
 
         RETURNS
-        float: distance in metres between points
+        numpy.ndarray: distance in metres between each pair of points (NaN if any co-ordinate is NaN)
         """
-        return geodesic(p1,p2).meters
+        a=GPSEvaluator.WGS84_A; b=GPSEvaluator.WGS84_B; f=GPSEvaluator.WGS84_F
+        missing=np.isnan(lat1)|np.isnan(lon1)|np.isnan(lat2)|np.isnan(lon2)
+        L=np.radians(lon2-lon1)
+        U1=np.arctan((1-f)*np.tan(np.radians(lat1))); U2=np.arctan((1-f)*np.tan(np.radians(lat2))) # reduced latitudes
+        sin_U1,cos_U1=np.sin(U1),np.cos(U1); sin_U2,cos_U2=np.sin(U2),np.cos(U2)
+
+        with np.errstate(invalid="ignore",divide="ignore"): # coincident points divide by zero, but are handled below
+            lam=L.copy(); converged=missing.copy()
+            for _ in range(100): # consecutive readings converge in 2 or 3 iterations
+                sin_lam,cos_lam=np.sin(lam),np.cos(lam)
+                sin_sigma=np.hypot(cos_U2*sin_lam,cos_U1*sin_U2-sin_U1*cos_U2*cos_lam)
+                cos_sigma=sin_U1*sin_U2+cos_U1*cos_U2*cos_lam
+                sigma=np.arctan2(sin_sigma,cos_sigma)
+                sin_alpha=np.where(sin_sigma==0,0,cos_U1*cos_U2*sin_lam/sin_sigma)
+                cos2_alpha=1-sin_alpha**2
+                cos_2sigma_m=np.where(cos2_alpha==0,0,cos_sigma-2*sin_U1*sin_U2/cos2_alpha) # 0 for points on the equator
+                C=f/16*cos2_alpha*(4+f*(4-3*cos2_alpha))
+                next_lam=L+(1-C)*f*sin_alpha*(sigma+C*sin_sigma*(cos_2sigma_m+C*cos_sigma*(-1+2*cos_2sigma_m**2)))
+                converged|=np.abs(next_lam-lam)<1e-12
+                if converged.all(): break
+                lam=np.where(converged,lam,next_lam) # converged pairs keep their values, so results don't depend on other pairs
+
+            u2=cos2_alpha*(a**2-b**2)/b**2
+            A=1+u2/16384*(4096+u2*(-768+u2*(320-175*u2)))
+            B=u2/1024*(256+u2*(-128+u2*(74-47*u2)))
+            delta_sigma=B*sin_sigma*(cos_2sigma_m+B/4*(cos_sigma*(-1+2*cos_2sigma_m**2)-B/6*cos_2sigma_m*(-3+4*sin_sigma**2)*(-3+4*cos_2sigma_m**2)))
+            distances=b*A*(sigma-delta_sigma)
+
+        distances[missing]=np.nan
+        for i in np.flatnonzero(~converged): # nearly antipodal points
+            distances[i]=geodesic((lat1[i],lon1[i]),(lat2[i],lon2[i])).meters
+        return distances
+
+    # distance models, from fastest to most accurate (see GPSEvaluator.distance)
+    DISTANCE_METHODS={
+        "equirectangular":__equirectangular_lat_lon,
+        "haversine":__haversine_lat_lon,
+        "vincenty":__vincenty_lat_lon,
+        "geodesic":__geodesic_lat_lon
+    }
 
     def time_to_seconds(df:pd.DataFrame) -> pd.Series:
         """
         SUMMARY
-        Returns the "time" column as the number of seconds since the first time.
+        Returns the "time" column as the number of (whole) seconds since the first time.
+        Computed with one subtraction of the int64 epoch nanoseconds behind the column, so activities longer than a day are handled.
         Assumes that rows are in chronological order.
 
         PARAMETERS
@@ -38,12 +156,15 @@ class GPSEvaluator:
                                requires "time" column
 
         RETURNS
-	    pandas.Series: seconds since first time in column
+	    pandas.Series: seconds since first time in column (int64, or float64 with NaN for missing times)
         """
         if "time" in df:
-            times=df["time"]
-            start_time=times[0]
-            return times.apply(lambda x:(x-start_time).seconds).astype(int)
+            ns=pd.to_datetime(df["time"]).values.astype("datetime64[ns]").view(np.int64) # no copy for datetime64 columns
+            present=ns!=np.iinfo(np.int64).min # NaT
+            if not present.any(): return pd.Series(np.full(len(ns),np.nan),index=df.index)
+            seconds=(ns-ns[present][0])//10**9
+            if present.all(): return pd.Series(seconds,index=df.index)
+            return pd.Series(np.where(present,seconds,np.nan),index=df.index)
         else: # not enough data
             return None
 
@@ -51,33 +172,39 @@ class GPSEvaluator:
     EVALUATE DATA
     """
 
-    def distance(df:pd.DataFrame) -> pd.Series:
+    def distance(df:pd.DataFrame,prev_point=None,method="vincenty") -> pd.Series:
         """
         SUMMARY
-        Produces a series of the euclidean distance between lat-lon co-ordinates.
+        Produces a series of the distance between consecutive lat-lon co-ordinates, computed for every row at once.
         Assumes rows are in chronological order
 
         PARAMETERS
         df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
                                requires "position_lat" & "position_lon" columns
+        prev_point ((float,float)): (lat,lon) of the reading before the first row. used when `df` is a chunk from GPSReader.iter_chunks.
+                                    pass `None` if `df` starts the route, so the first distance is 0. (default=None)
+        method (str): distance model. one of GPSEvaluator.DISTANCE_METHODS (default="vincenty")
+                      "equirectangular" (flat earth between readings, fastest), "haversine" (sphere),
+                      "vincenty" (WGS-84 ellipsoid, within 1mm of "geodesic") or "geodesic" (geopy, exact but slow).
+                      see GPSEvaluator.compare_distance_methods for the error & speed of each
 
         RETURNS
 	    pandas.Series: distance in metres between consecutive co-ordinates
         """
+        if method not in GPSEvaluator.DISTANCE_METHODS: raise ValueError("unknown distance method {}, use one of {}".format(method,list(GPSEvaluator.DISTANCE_METHODS)))
 
         if ("position_lat" in df.columns) and ("position_lon" in df.columns):
-            lat_lon=df[["position_lat","position_lon"]].copy()
-            prev_lat_lon=pd.concat([lat_lon.head(1).copy(),lat_lon.iloc[:-1,:].copy()],ignore_index=True) # associate previous lat-lon reading (first is repeated to ensure same length as readings)
+            lat=df["position_lat"].values.astype(np.float64); lon=df["position_lon"].values.astype(np.float64)
+            if len(lat)==0: return pd.Series(lat,index=df.index,name="distance")
+            first=(lat[0],lon[0]) if prev_point is None else prev_point
+            prev_lat=np.concatenate([[first[0]],lat[:-1]]); prev_lon=np.concatenate([[first[1]],lon[:-1]]) # associate previous lat-lon reading (first is repeated to ensure same length as readings)
 
-            lat_lon["prev_lat"]=prev_lat_lon["position_lat"]
-            lat_lon["prev_lon"]=prev_lat_lon["position_lon"]
-
-            lat_lon["distance"]=lat_lon.apply(lambda x:GPSEvaluator.__distance_lat_lon((x["position_lat"],x["position_lon"]),(x["prev_lat"],x["prev_lon"])),axis=1)
-            return lat_lon["distance"]
+            distances=GPSEvaluator.DISTANCE_METHODS[method](lat,lon,prev_lat,prev_lon)
+            return pd.Series(distances,index=df.index,name="distance")
 
         return None # insufficient data
 
-    def cumm_distance(df:pd.DataFrame) -> pd.Series:
+    def cumm_distance(df:pd.DataFrame,prev_point=None,start_dist=0,method="vincenty") -> pd.Series:
         """
         SUMMARY
         returns series with the cummulative distance along path defined by lat-lon coords
@@ -86,22 +213,145 @@ class GPSEvaluator:
 	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
                                requires "distance" column with data from GPSEvaluator.distance()
                                         OR "position_lat" & "position_lon" columns
+        prev_point ((float,float)): (lat,lon) of the reading before the first row, see GPSEvaluator.distance (default=None)
+        start_dist (float): distance covered before the first row. used when `df` is a chunk from GPSReader.iter_chunks (default=0)
+        method (str): distance model, see GPSEvaluator.distance. ignored if `df` has a "distance" column (default="vincenty")
 
         RETURNS
 	    pandas.Series: cummulative distance along path in metres (rounded to 2dp)
         """
 
         if ("distance" in df.columns): dists=df["distance"]
-        elif ("position_lat" in df.columns) and ("position_lon" in df.columns): dists=GPSEvaluator.distance(df)
+        elif ("position_lat" in df.columns) and ("position_lon" in df.columns): dists=GPSEvaluator.distance(df,prev_point=prev_point,method=method)
         else: return None # not enough data
 
-        return dists.cumsum().apply(lambda x:round(x,2))
+        return (dists.cumsum()+start_dist).round(2)
 
-    def splits(df:pd.DataFrame,split_dist=1000) -> pd.DataFrame:
+    def moving(df:pd.DataFrame,min_speed=0.5,min_stop=10,max_gap=30) -> pd.Series:
+        """
+        SUMMARY
+        Finds which readings were reached while moving, so stops (eg at traffic lights) can be left out of times.
+        A stop is a run of readings each reached at less than `min_speed`, lasting at least `min_stop` seconds.
+        A gap of more than `max_gap` seconds between readings (eg the device auto-paused) is a stop however short, unless it was covered at `min_speed`.
+        Stops are found for every reading at once, by run-length encoding the slow readings.
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
+                               requires "distance" ("position_lat" AND "position_lon" are sufficient)
+                               AND "seconds" ("time" is sufficient)
+        min_speed (float): slowest speed in metres per second counted as moving (default=0.5)
+        min_stop (float): shortest stop in seconds. shorter slow periods (eg GPS noise) are counted as moving (default=10)
+        max_gap (float): longest gap between readings in seconds which isn't treated as a pause (default=30)
+
+        RETURNS
+	    pandas.Series: bool for each reading, True if reached while moving (False for readings without a time)
+        """
+        distances=df["distance"] if ("distance" in df.columns) else GPSEvaluator.distance(df)
+        if distances is None: return None # not enough data
+        seconds=df["seconds"] if ("seconds" in df.columns) else GPSEvaluator.time_to_seconds(df)
+        if seconds is None: return None
+        return pd.Series(GPSEvaluator.__moving(distances.values,seconds.values,min_speed,min_stop,max_gap),index=df.index,name="moving")
+
+    def moving_seconds(df:pd.DataFrame,min_speed=0.5,min_stop=10,max_gap=30) -> pd.Series:
+        """
+        SUMMARY
+        Seconds spent moving since the first reading (ie "seconds" with stops left out). see GPSEvaluator.moving
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
+                               requires "distance" ("position_lat" AND "position_lon" are sufficient)
+                               AND "seconds" ("time" is sufficient)
+        min_speed, min_stop, max_gap: see GPSEvaluator.moving
+
+        RETURNS
+	    pandas.Series: moving time in seconds up to each reading (float64, NaN for readings without a time). the last value is the total moving time
+        """
+        distances=df["distance"] if ("distance" in df.columns) else GPSEvaluator.distance(df)
+        if distances is None: return None # not enough data
+        seconds=df["seconds"] if ("seconds" in df.columns) else GPSEvaluator.time_to_seconds(df)
+        if seconds is None: return None
+
+        seconds=seconds.values.astype(np.float64)
+        moving=GPSEvaluator.__moving(distances.values,seconds,min_speed,min_stop,max_gap)
+        present=~np.isnan(seconds)
+        gaps=np.diff(seconds[present],prepend=seconds[present][:1])
+        moving_seconds=np.full(len(seconds),np.nan)
+        moving_seconds[present]=np.cumsum(np.where(moving[present],gaps,0))
+        return pd.Series(moving_seconds,index=df.index,name="moving_seconds")
+
+    def __moving(distances:np.ndarray,seconds:np.ndarray,min_speed:float,min_stop:float,max_gap:float) -> np.ndarray:
+        """
+        SUMMARY
+        Which readings were reached while moving, see GPSEvaluator.moving
+
+        PARAMETERS
+        distances (numpy.ndarray): distance from previous reading (see GPSEvaluator.distance)
+        seconds (numpy.ndarray): seconds since first reading (see GPSEvaluator.time_to_seconds)
+        min_speed, min_stop, max_gap: see GPSEvaluator.moving
+
+        RETURNS
+        numpy.ndarray: bool for each reading, True if reached while moving
+        """
+        seconds=seconds.astype(np.float64)
+        rows=np.flatnonzero(~np.isnan(seconds)) # readings with a time
+        moving=np.zeros(len(seconds),dtype=bool)
+        if len(rows)==0: return moving
+        cumm_dists=np.cumsum(np.nan_to_num(distances.astype(np.float64)))[rows]
+        covered=np.diff(cumm_dists,prepend=cumm_dists[0]); gaps=np.diff(seconds[rows],prepend=seconds[rows[0]]) # since previous reading with a time
+
+        slow=np.where(gaps>0,covered<min_speed*gaps,covered==0)
+        is_start=slow&~np.concatenate([[False],slow[:-1]]) # run-length encode slow readings
+        starts=np.flatnonzero(is_start)
+        if len(starts)==0: moving[rows]=True; return moving
+        run=np.cumsum(is_start)-1 # run each reading is in (or follows)
+        durations=np.add.reduceat(np.where(slow,gaps,0),starts)
+        paused=np.add.reduceat((gaps>max_gap)&slow,starts)>0
+        stopped=(durations>=min_stop)|paused
+
+        moving[rows]=~(slow&stopped[np.maximum(run,0)])
+        return moving
+
+    def compare_distance_methods(paths:[str],reference="geodesic") -> pd.DataFrame:
+        """
+        SUMMARY
+        Measure the error & speed of each distance model (see GPSEvaluator.distance) on some gps files.
+
+        PARAMETERS
+        paths (list(str)): paths to gps files (see GPSReader.read)
+        reference (str): distance model which errors are measured against (default="geodesic")
+
+        RETURNS
+        pandas.DataFrame: row for each file & method. "max_error" & "mean_error" (metres between consecutive readings),
+                          "total_error" (metres over whole route) & "points_per_second" (best of repeated runs)
+        """
+        reader=GPSReader(); rows=[]
+        for path in paths:
+            data,_=reader.read(path,columnar=True,columns=["position_lat","position_lon"])
+            if data==-1: continue # unsupported file
+            df=reader.data_to_dataframe(data)
+            if len(df)==0: continue
+
+            distances={}; speeds={}
+            for method in GPSEvaluator.DISTANCE_METHODS:
+                best=None; total=0
+                while total<0.2: # repeat fast methods, so timings aren't just overhead
+                    start=time.perf_counter()
+                    distances[method]=GPSEvaluator.distance(df,method=method).values
+                    taken=time.perf_counter()-start
+                    best=taken if best is None else min(best,taken); total+=taken
+                speeds[method]=len(df)/max(best,1e-9)
+
+            for method,values in distances.items():
+                errors=np.abs(values-distances[reference])
+                rows.append({"file":os.path.basename(path),"method":method,"max_error":np.nanmax(errors),"mean_error":np.nanmean(errors),
+                             "total_error":abs(np.nansum(values)-np.nansum(distances[reference])),"points_per_second":speeds[method]})
+        return pd.DataFrame(rows,columns=["file","method","max_error","mean_error","total_error","points_per_second"]).set_index(["file","method"])
+
+    def splits(df:pd.DataFrame,split_dist=1000,moving=False) -> pd.DataFrame:
         """
         SUMMARY
         Calcualtes time taken to complete splits of a defined distance.
-        Interpolation is used when measurements don't end exactly on a split.
+        The readings either side of each split boundary are found with a single binary search, and the time the boundary was crossed is linearly interpolated between them.
         Any excess is ignored (ie if distance if 8.9km and readings are made for 1km, .9km will be lost)
 
         PARAMETERS
@@ -110,41 +360,57 @@ class GPSEvaluator:
                                AND "seconds" ("time" is sufficient)
         split_dist (int): length of split in metres
                           (default=1000)
+        moving (bool): time only spent moving, leaving out stops (see GPSEvaluator.moving_seconds).
+                       uses "moving_seconds" column if present (default=False)
 
         RETURNS
 	    pandas.DataFrame: "dist" (cumm distance in metres at end of split), "time" (time in seconds for split)
         """
-        # check sufficient data exists
-        if "cumm_distance" not in df.columns:
-            cumm_dists=GPSEvaluator.cumm_distance(df)
-            if cumm_dists is None: return None # not enough data
-            df["cumm_distance"]=cumm_dists
-        if "seconds" not in df.columns:
-            seconds=GPSEvaluator.time_to_seconds(df)
-            if seconds is None: return None
-            df["seconds"]=seconds
-
-        data=df[["seconds","cumm_distance"]].copy()
-        targ_dist=split_dist
-        prev_time=0; splits=pd.DataFrame(columns=["dist","time"])
-
-        for _,row in data.iterrows():
-            if row["cumm_distance"]>=targ_dist:
-                # record values
-                split_time=row["seconds"]-prev_time
-                new_row=pd.DataFrame({"dist":[targ_dist],"time":split_time})
-                splits=splits.append(new_row,ignore_index=True)
-
-                # set up for next split
-                targ_dist+=split_dist
-                prev_time=row["seconds"]
-
-        return splits
+        if split_dist<=0: raise ValueError("split_dist must be positive")
+        # check sufficient data exists. `df` is left unchanged
+        cumm_dists=df["cumm_distance"] if ("cumm_distance" in df.columns) else GPSEvaluator.cumm_distance(df)
+        if cumm_dists is None: return None # not enough data
+        if moving: seconds=df["moving_seconds"] if ("moving_seconds" in df.columns) else GPSEvaluator.moving_seconds(df)
+        else: seconds=df["seconds"] if ("seconds" in df.columns) else GPSEvaluator.time_to_seconds(df)
+        if seconds is None: return None
+
+        boundaries,times=GPSEvaluator.crossings(cumm_dists.values,seconds.values,split_dist)
+        return pd.DataFrame({"dist":boundaries,"time":np.diff(times,prepend=0)}) # time of each split, from time each boundary was crossed
+
+    def crossings(cumm_dists:np.ndarray,values:np.ndarray,split_dist:float,after_dist=0) -> (np.ndarray,np.ndarray):
+        """
+        SUMMARY
+        Finds when a route crosses each multiple of `split_dist`, interpolating `values` between the readings either side.
+
+        PARAMETERS
+        cumm_dists (numpy.ndarray): cummulative distance of each reading (see GPSEvaluator.cumm_distance)
+        values (numpy.ndarray): value to interpolate (eg seconds) at each reading.
+                                readings missing either value are ignored, so values are only interpolated between readings which have both
+        split_dist (float): distance in metres between boundaries
+        after_dist (float): only boundaries beyond this distance are found. used when readings continue a route (see IncrementalEvaluator) (default=0)
+
+        RETURNS
+        numpy.ndarray: distance of each boundary crossed (multiples of `split_dist`)
+        numpy.ndarray: interpolated value at each boundary
+        """
+        cumm_dists=np.asarray(cumm_dists,dtype=np.float64); values=np.asarray(values,dtype=np.float64)
+        present=~np.isnan(cumm_dists)&~np.isnan(values)
+        cumm_dists=np.maximum.accumulate(cumm_dists[present]); values=values[present] # binary search requires distances never decrease
+        if len(cumm_dists)==0: return np.empty(0,dtype=np.int64),np.empty(0)
+
+        boundaries=split_dist*np.arange(int(after_dist//split_dist)+1,int(cumm_dists[-1]//split_dist)+1)
+        after=np.searchsorted(cumm_dists,boundaries,side="left") # first reading at or beyond each boundary
+        before=np.maximum(after-1,0)
+        gap=cumm_dists[after]-cumm_dists[before]
+        with np.errstate(invalid="ignore",divide="ignore"):
+            fraction=np.where(gap>0,(boundaries-cumm_dists[before])/gap,1) # readings on a boundary don't need interpolating
+        return boundaries,values[before]+fraction*(values[after]-values[before])
 
     def split_markers(df:pd.DataFrame,split_dist=1000) -> pd.DataFrame:
         """
         SUMMARY
-        Returns the GPS co-ordinates of end point of splits
+        Returns the GPS co-ordinates of end point of splits.
+        Every boundary is found at once (see GPSEvaluator.splits) & its position is interpolated along the segment which crosses it.
 
         PARAMETERS
 	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
@@ -156,20 +422,223 @@ class GPSEvaluator:
         RETURNS
 	    pandas.DataFrame: "dist", "position_lat","position_lon" of split endpoints
         """
-        if "cumm_distance" not in df.columns:
-            cumm_dists=GPSEvaluator.cumm_distance(df)
-            if cumm_dists is None: return None # not enough data
-            df["cumm_distance"]=cumm_dists
+        if split_dist<=0: raise ValueError("split_dist must be positive")
+        cumm_dists=df["cumm_distance"] if ("cumm_distance" in df.columns) else GPSEvaluator.cumm_distance(df) # `df` is left unchanged
+        if cumm_dists is None: return None # not enough data
+        cumm_dists=cumm_dists.values
+        boundaries,lats=GPSEvaluator.crossings(cumm_dists,df["position_lat"].values,split_dist)
+        _,lons=GPSEvaluator.crossings(cumm_dists,df["position_lon"].values,split_dist)
+        return pd.DataFrame({"dist":boundaries,"position_lat":lats,"position_lon":lons})
+
+    def resample(df:pd.DataFrame,every_m=None,every_s=None) -> pd.DataFrame:
+        """
+        SUMMARY
+        Readings evenly spaced by distance (every `every_m` metres) or by time (every `every_s` seconds), from the start of the route.
+        Every column is linearly interpolated between the readings either side (np.interp), for all readings at once.
+        The result has a known length however often the device recorded, & can be passed to any other method (eg splits, histograms & SVGMaker.generate_elevation_svg).
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
+                               requires "cumm_distance" ("distance" OR ("position_lat" AND "position_lon") are sufficient) for `every_m`
+                               OR "seconds" ("time" is sufficient) for `every_s`
+        every_m (float): distance in metres between readings. pass `None` to resample by time (default=None)
+        every_s (float): time in seconds between readings. pass `None` to resample by distance (default=None)
+
+        RETURNS
+	    pandas.DataFrame: evenly spaced readings, with the columns of `df` (in the dtypes of GPSReader.SCHEMA) & "distance", "cumm_distance" & "seconds" (where data allows).
+                          values which can't be interpolated (eg outside the readings with a heart rate) are missing. columns which aren't numbers are left out.
+        """
+        if (every_m is None)==(every_s is None): raise ValueError("pass one of every_m or every_s")
+        step=every_m if every_m is not None else every_s
+        if step<=0: raise ValueError("every_m & every_s must be positive")
+
+        columns={name:df[name].values for name in df.columns if name=="time" or (np.issubdtype(df[name].dtype,np.number) and name!="distance")}
+        cumm_dists=df["cumm_distance"] if ("cumm_distance" in df.columns) else GPSEvaluator.cumm_distance(df) # `df` is left unchanged
+        seconds=df["seconds"] if ("seconds" in df.columns) else (GPSEvaluator.time_to_seconds(df) if "time" in df.columns else None)
+        if cumm_dists is not None: columns["cumm_distance"]=cumm_dists.values
+        if seconds is not None: columns["seconds"]=seconds.values
+        axis_name="cumm_distance" if every_m is not None else "seconds"
+        if axis_name not in columns: return None # not enough data
+
+        axis=columns[axis_name].astype(np.float64)
+        rows=np.flatnonzero(~np.isnan(axis))
+        if len(rows)==0: return None # not enough data
+        axis=np.maximum.accumulate(axis[rows])
+        last=np.append(axis[1:]>axis[:-1],True) # interpolation requires increasing values, so keep the last of any repeated readings (eg stops)
+        rows=rows[last]; axis=axis[last]
+        grid=axis[0]+step*np.arange(int((axis[-1]-axis[0])//step)+1)
+
+        reader=GPSReader(); resampled={}
+        for name,values in columns.items():
+            values=values[rows]
+            if name==axis_name: resampled[name]=grid; continue
+            if name=="time": values=pd.to_datetime(values).values.astype("datetime64[ns]").view(np.int64)
+            present=~(values==NAT if name=="time" else reader.missing(name,values))
+            if not present.any(): resampled[name]=np.full(len(grid),NAT if name=="time" else np.nan); continue
+            origin=values[present][0] if name=="time" else 0 # interpolate times relative to the first, so nanoseconds aren't lost to float64
+            interpolated=np.interp(grid,axis[present],(values[present]-origin).astype(np.float64),left=np.nan,right=np.nan)
+            if name=="time": interpolated=np.where(np.isnan(interpolated),NAT,np.rint(np.nan_to_num(interpolated)).astype(np.int64)+origin)
+            resampled[name]=interpolated
+        if "cumm_distance" in resampled: resampled["distance"]=np.diff(resampled["cumm_distance"],prepend=resampled["cumm_distance"][:1])
+        return reader.columns_to_dataframe(reader.apply_schema(resampled))
+
+    def best_efforts(df:pd.DataFrame,distances=[400,1000,5000,10000,21097,42195]) -> pd.DataFrame:
+        """
+        SUMMARY
+        Fastest time taken to cover each distance, starting anywhere on the route.
+        Time is linearly interpolated between readings, so the fastest window always has one end on a reading.
+        Every window starting on a reading and every window ending on a reading is checked, with the other end found by a single binary search
+        over all readings at once (a vectorised sliding window), so each distance takes O(n log n) numpy operations rather than O(n^2).
+        the "numba" backend slides both ends of the window along the readings instead, in O(n) (see Kernels.best_effort).
 
-        data=df[["position_lat","position_lon","cumm_distance"]]
-        split_coords=[]
-        target_dist=split_dist
-        for _,row in data.iterrows():
-            if (row["cumm_distance"]>=target_dist):
-                split_coords.append({"dist":target_dist,"position_lat":row["position_lat"],"position_lon":row["position_lon"]})
-                target_dist+=split_dist
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
+                               requires "cumm_distance" ("distance" OR ("position_lat" AND "position_lon") are sufficient)
+                               AND "seconds" ("time" is sufficient)
+        distances (list(float)): distances in metres (default=[400,1000,5000,10000,21097,42195])
 
-        return pd.DataFrame(split_coords)
+        RETURNS
+	    pandas.DataFrame: row for each distance covered by the route (longer distances are left out).
+                          "dist" (distance in metres), "time" (fastest time in seconds),
+                          "start" & "end" (row number of first & last reading in fastest window)
+        """
+        cumm_dists=df["cumm_distance"] if ("cumm_distance" in df.columns) else GPSEvaluator.cumm_distance(df) # `df` is left unchanged
+        if cumm_dists is None: return None # not enough data
+        seconds=df["seconds"] if ("seconds" in df.columns) else GPSEvaluator.time_to_seconds(df)
+        if seconds is None: return None
+
+        cumm_dists=cumm_dists.values.astype(np.float64); seconds=seconds.values.astype(np.float64)
+        rows=np.flatnonzero(~np.isnan(cumm_dists)&~np.isnan(seconds)) # row number of each reading used
+        cumm_dists=np.maximum.accumulate(cumm_dists[rows]); seconds=seconds[rows] # binary search requires distances never decrease
+
+        best_effort=Kernels.best_effort if GPSEvaluator.backend=="numba" else GPSEvaluator.__best_effort
+        efforts=[]
+        for dist in distances:
+            if len(rows)<2 or dist<=0 or cumm_dists[-1]-cumm_dists[0]<dist: continue
+            time_taken,start,end=best_effort(cumm_dists,seconds,float(dist))
+            efforts.append((dist,time_taken,rows[start],rows[end]))
+        return pd.DataFrame(efforts,columns=["dist","time","start","end"])
+
+    def __best_effort(cumm_dists:np.ndarray,seconds:np.ndarray,dist:float) -> (float,int,int):
+        """
+        SUMMARY
+        Fastest window covering `dist`, see GPSEvaluator.best_efforts. Kernels.best_effort gives the same result with a two-pointer loop
+
+        PARAMETERS
+        cumm_dists (numpy.ndarray): non-decreasing cummulative distance of each reading (covering at least `dist`)
+        seconds (numpy.ndarray): seconds at each reading, without NaN
+        dist (float): positive distance in metres
+
+        RETURNS
+        float: fastest time in seconds
+        int: index of first reading in fastest window
+        int: index of last reading in fastest window
+        """
+        # windows starting on a reading, ending at the first time `dist` further is reached
+        starts=np.flatnonzero(cumm_dists+dist<=cumm_dists[-1])
+        start_ends=np.searchsorted(cumm_dists,cumm_dists[starts]+dist,side="left") # first reading at or beyond end of window
+        from_start=GPSEvaluator.__interpolate(cumm_dists,seconds,cumm_dists[starts]+dist,start_ends-1,start_ends)-seconds[starts]
+
+        # windows ending on a reading, starting at the last time `dist` before is left
+        ends=np.flatnonzero(cumm_dists-dist>=cumm_dists[0])
+        end_starts=np.searchsorted(cumm_dists,cumm_dists[ends]-dist,side="right")-1 # last reading at or before start of window
+        to_end=seconds[ends]-GPSEvaluator.__interpolate(cumm_dists,seconds,cumm_dists[ends]-dist,end_starts,end_starts+1)
+
+        i=np.argmin(from_start); j=np.argmin(to_end)
+        if from_start[i]<=to_end[j]: return from_start[i],starts[i],start_ends[i]
+        return to_end[j],end_starts[j],ends[j]
+
+    def __interpolate(cumm_dists:np.ndarray,values:np.ndarray,targets:np.ndarray,before:np.ndarray,after:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        Linearly interpolate values at distances between pairs of readings
+
+        PARAMETERS
+        cumm_dists (numpy.ndarray): non-decreasing cummulative distance of each reading
+        values (numpy.ndarray): value (eg seconds) at each reading
+        targets (numpy.ndarray): distances to interpolate at
+        before (numpy.ndarray): index of reading at or before each target
+        after (numpy.ndarray): index of reading at or after each target
+
+        RETURNS
+        numpy.ndarray: interpolated value at each target
+        """
+        gap=cumm_dists[after]-cumm_dists[before]
+        with np.errstate(invalid="ignore",divide="ignore"):
+            fraction=np.where(gap>0,(targets-cumm_dists[before])/gap,1) # targets on a reading don't need interpolating
+        return values[before]+fraction*(values[after]-values[before])
+
+    def summary(df:pd.DataFrame,method="vincenty",smoothing="median",speed_window=5,min_speed=0.5,min_stop=10,max_gap=30) -> dict:
+        """
+        SUMMARY
+        Totals of an activity, for indexing many files. Each column is read once as a numpy array & every total is calculated from
+        those arrays (distances, seconds & moving readings are shared), so no dataframes are copied.
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read() (or ActivityCache.read, whose derived columns are used)
+        method (str): distance model, see GPSEvaluator.distance. ignored if `df` has a "distance" column (default="vincenty")
+        smoothing (str): altitude smoothing for "ascent", see GPSEvaluator.smooth_altitude (default="median")
+        speed_window (float): shortest time in seconds "max_speed" is measured over, so single GPS jumps are ignored (default=5)
+        min_speed, min_stop, max_gap (float): which readings count towards "moving_time" & "avg_speed", see GPSEvaluator.moving (defaults=0.5, 10 & 30)
+
+        RETURNS
+	    dict: "points" (int): number of readings
+                  "distance" (float): metres covered
+                  "elapsed_time" & "moving_time" (float): seconds from first to last reading, & seconds spent moving (see GPSEvaluator.moving)
+                  "ascent" (float): metres climbed (see GPSEvaluator.elevation_stats)
+                  "avg_speed" & "max_speed" (float): average moving speed & fastest speed over `speed_window` seconds in metres per second
+                  "avg_heart_rate" & "max_heart_rate" (float): beats per minute
+                  "min_lat", "max_lat", "min_lon", "max_lon" (float): bounding box of route
+                  "start" & "finish" ((float,float)): (lat,lon) of first & last reading
+                  "start_time" (pandas.Timestamp): time of first reading
+                  values are None where `df` has insufficient data
+        """
+        record={"points":len(df),"distance":None,"elapsed_time":None,"moving_time":None,"ascent":None,"avg_speed":None,"max_speed":None,
+                "avg_heart_rate":None,"max_heart_rate":None,"min_lat":None,"max_lat":None,"min_lon":None,"max_lon":None,"start":None,"finish":None,"start_time":None}
+        if len(df)==0: return record
+
+        if ("position_lat" in df.columns) and ("position_lon" in df.columns):
+            lat=df["position_lat"].values.astype(np.float64); lon=df["position_lon"].values.astype(np.float64)
+            located=np.flatnonzero(~np.isnan(lat)&~np.isnan(lon))
+            if len(located)>0:
+                record.update({"min_lat":float(lat[located].min()),"max_lat":float(lat[located].max()),"min_lon":float(lon[located].min()),"max_lon":float(lon[located].max()),
+                               "start":(float(lat[located[0]]),float(lon[located[0]])),"finish":(float(lat[located[-1]]),float(lon[located[-1]]))})
+        distances=df["distance"] if ("distance" in df.columns) else GPSEvaluator.distance(df,method=method)
+        if distances is not None:
+            distances=distances.values.astype(np.float64)
+            record["distance"]=float(np.nansum(distances))
+
+        if "time" in df.columns:
+            ns=pd.to_datetime(df["time"]).values.astype("datetime64[ns]").view(np.int64)
+            timed=ns!=NAT
+            if timed.any(): record["start_time"]=pd.Timestamp(ns[timed][0])
+        seconds=df["seconds"] if ("seconds" in df.columns) else (GPSEvaluator.time_to_seconds(df) if "time" in df.columns else None)
+        if seconds is not None and not seconds.isna().all():
+            seconds=seconds.values.astype(np.float64)
+            rows=np.flatnonzero(~np.isnan(seconds))
+            record["elapsed_time"]=float(seconds[rows[-1]]-seconds[rows[0]])
+            if distances is not None: # speeds between readings with a time
+                moving=GPSEvaluator.__moving(distances,seconds,min_speed,min_stop,max_gap)[rows]
+                cumm_dists=np.cumsum(np.nan_to_num(distances))[rows]
+                times=np.maximum.accumulate(seconds[rows]); gaps=np.diff(times)
+                record["moving_time"]=float(gaps[moving[1:]].sum())
+                record["avg_speed"]=record["distance"]/record["moving_time"] if record["moving_time"]>0 else None
+                ends=np.searchsorted(times,times+max(speed_window,1e-9),side="left") # first reading at least `speed_window` after each reading
+                windowed=ends<len(times)
+                if windowed.any():
+                    starts=np.flatnonzero(windowed); ends=ends[windowed]
+                    record["max_speed"]=float(((cumm_dists[ends]-cumm_dists[starts])/(times[ends]-times[starts])).max())
+
+        if "altitude" in df.columns:
+            altitudes=GPSEvaluator.smooth_altitude(df,method=smoothing).values
+            changes=np.diff(altitudes[~np.isnan(altitudes)])
+            if len(changes)>0: record["ascent"]=float(changes[changes>0].sum())
+
+        if "heart_rate" in df.columns:
+            heart_rates=df["heart_rate"].values
+            heart_rates=heart_rates[~GPSReader().missing("heart_rate",heart_rates)]
+            if len(heart_rates)>0: record.update({"avg_heart_rate":float(heart_rates.mean()),"max_heart_rate":float(heart_rates.max())})
+        return record
 
     def important_points(df:pd.DataFrame,name:str) -> pd.Series:
         """
@@ -189,9 +658,159 @@ class GPSEvaluator:
         if name=="finish": return df.iloc[-1][["position_lat"]],df.iloc[-1][["position_lon"]]
         return None
 
+    """ELEVATION"""
+
+    def smooth_altitude(df:pd.DataFrame,method="median",window=5,threshold=3) -> pd.Series:
+        """
+        SUMMARY
+        Remove noise from the "altitude" column (gps & barometric altitudes jump by a few metres between readings). every reading is smoothed at once.
+        "median" takes the median of each `window` readings (removes spikes), "savgol" fits a quadratic to each `window` readings
+        (Savitzky-Golay filter, keeps the shape of climbs) & "hysteresis" only changes altitude once it has moved `threshold` metres
+        from the current value (removes small ups & downs).
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read()
+                               requires "altitude" column
+        method (str): one of GPSEvaluator.SMOOTHING_METHODS, or `None` for no smoothing (default="median")
+        window (int): number of readings in each window for "median" & "savgol". made odd if even (default=5)
+        threshold (float): metres altitude must move by before it changes for "hysteresis" (default=3)
+
+        RETURNS
+	    pandas.Series: smoothed altitude in metres (float64). missing readings are NaN & ignored when smoothing others
+        """
+        if method is not None and method not in GPSEvaluator.SMOOTHING_METHODS: raise ValueError("unknown smoothing method {}, use one of {}".format(method,GPSEvaluator.SMOOTHING_METHODS))
+        if "altitude" not in df.columns: return None # not enough data
+
+        altitudes=df["altitude"].values.astype(np.float64)
+        present=~np.isnan(altitudes)
+        values=altitudes[present]
+        window=min(window|1,len(values)-(1-len(values)%2)) # odd & no longer than data
+        if method=="median" and window>1: values=np.median(GPSEvaluator.__windows(values,window),axis=1)
+        elif method=="savgol" and window>3: values=GPSEvaluator.__windows(values,window)@GPSEvaluator.__savgol_coefficients(window,2)
+        elif method=="hysteresis" and len(values)>0: values=GPSEvaluator.__hysteresis(values,threshold)
+
+        smoothed=np.full(len(altitudes),np.nan); smoothed[present]=values
+        return pd.Series(smoothed,index=df.index,name="altitude")
+
+    # smoothing filters for GPSEvaluator.smooth_altitude
+    SMOOTHING_METHODS=["median","savgol","hysteresis"]
+
+    def __windows(values:np.ndarray,window:int) -> np.ndarray:
+        """
+        SUMMARY
+        View of every `window` consecutive values, centred on each value. ends are padded by repeating the first & last value
+
+        PARAMETERS
+        values (numpy.ndarray): values
+        window (int): odd number of values in each window
+
+        RETURNS
+        numpy.ndarray: 2d array with a row for each value (a view of one padded copy of `values`, nothing else is copied)
+        """
+        padded=np.pad(values,window//2,mode="edge")
+        return np.lib.stride_tricks.as_strided(padded,shape=(len(values),window),strides=(padded.strides[0],padded.strides[0]),writeable=False)
+
+    def __savgol_coefficients(window:int,order:int) -> np.ndarray:
+        """
+        SUMMARY
+        Weights which give the value at the centre of a least squares polynomial fit to a window of values (Savitzky-Golay filter)
+
+        PARAMETERS
+        window (int): odd number of values in each window
+        order (int): order of polynomial
+
+        RETURNS
+        numpy.ndarray: weight of each value in window
+        """
+        offsets=np.arange(window)-window//2
+        return np.linalg.pinv(np.vander(offsets,order+1,increasing=True))[0] # row giving the constant term, ie the fit at offset 0
+
+    def __hysteresis(values:np.ndarray,threshold:float) -> np.ndarray:
+        """
+        SUMMARY
+        Follow `values`, only moving once they are more than `threshold` away (ie each output is the previous output clamped to value±threshold).
+        Clamping to one interval then another is the same as clamping to a single interval, so the clamp up to each value is found
+        by combining pairs of intervals, then pairs of pairs, etc (a parallel prefix scan). log2(n) numpy operations, rather than a loop over values.
+        the loop is used with the "numba" backend (see Kernels.hysteresis).
+
+        PARAMETERS
+        values (numpy.ndarray): values without NaN
+        threshold (float): distance values must move before output changes
+
+        RETURNS
+        numpy.ndarray: output for each value
+        """
+        if GPSEvaluator.backend=="numba": return Kernels.hysteresis(values.astype(np.float64),float(threshold))
+        low=values-threshold; high=values+threshold # clamp applied at each value
+        shift=1
+        while shift<len(values): # combine clamps up to each value with the clamps `shift` before
+            low,high=np.concatenate([low[:shift],np.clip(low[:-shift],low[shift:],high[shift:])]),np.concatenate([high[:shift],np.clip(high[:-shift],low[shift:],high[shift:])])
+            shift*=2
+        return np.clip(values[0],low,high)
+
+    def elevation_stats(df:pd.DataFrame,smoothing="median",window=5,threshold=3,min_climb=10) -> dict:
+        """
+        SUMMARY
+        Climbing statistics of route, from altitude smoothed by GPSEvaluator.smooth_altitude.
+        Climbs run from a low point to the next high point, where altitude doesn't drop by more than `threshold` metres in between.
+
+        PARAMETERS
+	    df (pandas.DataFrame): dataframe of data produced by GPSReader.read().
+                               requires "altitude" column.
+                               "cumm_distance" ("distance" OR ("position_lat" AND "position_lon") are sufficient) is required for gradient & climbs
+        smoothing (str): smoothing filter, see GPSEvaluator.smooth_altitude. pass `None` for raw altitude (default="median")
+        window (int): readings in each window of smoothing filter, see GPSEvaluator.smooth_altitude (default=5)
+        threshold (float): drop in metres which ends a climb. also used by "hysteresis" smoothing (default=3)
+        min_climb (float): minimum gain in metres of a climb (default=10)
+
+        RETURNS
+	    dict: "ascent" & "descent" (float): total metres climbed & descended
+                  "min_altitude" & "max_altitude" (float): lowest & highest altitude in metres
+                  "gradient" (pandas.Series): gradient in % from previous reading to each reading (NaN for the first reading, missing readings & stops)
+                  "climbs" (pandas.DataFrame): row for each climb. "start" & "end" (row number of lowest & highest reading),
+                                               "start_dist", "length" & "gain" (metres) & "gradient" (average %)
+                  "gradient" & "climbs" are None if distance can't be calculated
+                  (None if insufficient data)
+        """
+        altitudes=GPSEvaluator.smooth_altitude(df,method=smoothing,window=window,threshold=threshold)
+        if altitudes is None or altitudes.isna().all(): return None # not enough data
+        rows=np.flatnonzero(~np.isnan(altitudes.values)) # row number of each reading with an altitude
+        values=altitudes.values[rows]
+
+        changes=np.diff(values)
+        stats={"ascent":float(changes[changes>0].sum()),"descent":float(abs(changes[changes<0].sum())),
+               "min_altitude":float(values.min()),"max_altitude":float(values.max()),"gradient":None,"climbs":None}
+
+        cumm_dists=df["cumm_distance"] if ("cumm_distance" in df.columns) else GPSEvaluator.cumm_distance(df) # `df` is left unchanged
+        if cumm_dists is None: return stats
+        dists=cumm_dists.values.astype(np.float64)[rows]
+
+        gaps=np.diff(dists)
+        with np.errstate(invalid="ignore",divide="ignore"):
+            gradient=np.full(len(df),np.nan); gradient[rows[1:]]=np.where(gaps>0,100*changes/gaps,np.nan)
+        stats["gradient"]=pd.Series(gradient,index=df.index,name="gradient")
+
+        # high & low points: where the altitude (ignoring reversals within `threshold`) last rose or fell before changing direction
+        steps=np.diff(GPSEvaluator.__hysteresis(values,threshold)) if len(values)>1 else np.empty(0)
+        moved=np.flatnonzero(steps!=0); rising=steps[moved]>0
+        turns=np.flatnonzero(np.append(rising[1:]!=rising[:-1],True)) if len(moved)>0 else np.empty(0,dtype=np.int64) # last step in each direction
+        ends=moved[turns]+1; ends_rising=rising[turns]
+
+        highs=np.flatnonzero(ends_rising)
+        lows=ends[np.maximum(highs-1,0)] # previous low point
+        if len(highs)>0 and highs[0]==0: lows[0]=np.argmin(values[:ends[0]+1]) # route starts climbing, so start from lowest point before first high point
+        climbs=np.stack([lows,ends[highs]],axis=1).astype(np.int64).reshape(-1,2)
+        gains=values[climbs[:,1]]-values[climbs[:,0]]; lengths=dists[climbs[:,1]]-dists[climbs[:,0]]
+        keep=(gains>=min_climb)&~np.isnan(lengths)
+        climbs=climbs[keep]; gains=gains[keep]; lengths=lengths[keep]
+        with np.errstate(invalid="ignore",divide="ignore"):
+            stats["climbs"]=pd.DataFrame({"start":rows[climbs[:,0]],"end":rows[climbs[:,1]],"start_dist":dists[climbs[:,0]],
+                                          "length":lengths,"gain":gains,"gradient":np.where(lengths>0,100*gains/lengths,np.nan)})
+        return stats
+
     """HISTOGRAM"""
 
-    def split_histogram_data(df:pd.DataFrame,bin_width=10,sampling_dist=100,clean=False) -> pd.Series:
+    def split_histogram_data(df:pd.DataFrame,bin_width=10,sampling_dist=100,clean=False,splits=None,moving=False) -> pd.Series:
         """
         SUMMARY
         Calculate time spent at given splits(speed).
@@ -204,25 +823,42 @@ class GPSEvaluator:
         bin_width (int): width of bin in seconds for seconds per km split
         sampling_dist (int): how often in metres to sample from the data set (default=100)
         clean (bool): remove extreme data
+        splits (pandas.DataFrame): GPSEvaluator.splits(df,split_dist=sampling_dist,moving=moving), if already calculated. pass `None` to calculate (default=None)
+        moving (bool): use time spent moving, so stops don't add slow splits (see GPSEvaluator.splits) (default=False)
 
         RETURNS
 	    pd.Series: count of samples falling in each bin
                    index is the split in seconds per km
         """
 
-        split_data=GPSEvaluator.splits(df,split_dist=sampling_dist)["time"] # generalise data
-        split_data=split_data.apply(lambda x:x*(1000/sampling_dist)).astype(int) # extrapolate km splits
-
-        bins={val:0 for val in range(floor(split_data.min()/bin_width)*bin_width,split_data.max()+1,bin_width)}
-        for _,val in split_data.iteritems():
-            lower_bound=floor(val/bin_width)*bin_width
-            bins[lower_bound]+=1
+        if splits is None: splits=GPSEvaluator.splits(df,split_dist=sampling_dist,moving=moving) # generalise data
+        split_data=splits["time"]
+        split_data=(split_data*(1000/sampling_dist)).astype(int) # extrapolate km splits
 
-        bins_ser=pd.Series(bins)
-        if clean: return GPSEvaluator.__clean_histogram_data(bins_ser) # remove extreme data
+        lower_bounds,bin_indices=GPSEvaluator.__bin_indices(split_data.values,bin_width)
+        bins_ser=pd.Series(np.bincount(bin_indices,minlength=len(lower_bounds)),index=lower_bounds)
+        if clean: return GPSEvaluator.clean_histogram_data(bins_ser) # remove extreme data
         return bins_ser
 
-    def __clean_histogram_data(splits:pd.Series,min_kept=.9) -> pd.Series:
+    def __bin_indices(values:np.ndarray,bin_width:int) -> (np.ndarray,np.ndarray):
+        """
+        SUMMARY
+        Assign values to bins of equal width, from the bin containing the smallest value to the bin containing the largest
+
+        PARAMETERS
+        values (numpy.ndarray): integer values to bin
+        bin_width (int): width of each bin
+
+        RETURNS
+        numpy.ndarray: lower bound of each bin
+        numpy.ndarray: index of the bin each value falls in
+        """
+        if len(values)==0: return np.empty(0,dtype=np.int64),np.empty(0,dtype=np.int64)
+        bins=np.floor_divide(values,bin_width).astype(np.int64)
+        first=bins.min()
+        return np.arange(first,bins.max()+1)*bin_width,bins-first
+
+    def clean_histogram_data(splits:pd.Series,min_kept=.9) -> pd.Series:
         """
         SUMMARY
         keeps densiest cluster which contains min_kept% of all values
@@ -234,45 +870,37 @@ class GPSEvaluator:
         RETURNS
 	    pandas.Series: cleaned data
         """
-        clusters=[] # lower & upper values of clusters
-        cluster_mass={} # count what % of data cluster holds
-        total_mass=splits.sum()
-
-        lower=splits.index[0]; in_cluster=True; mass=0; prev=None # prepare to record clusters
-        for bound,count in splits.iteritems():
-            mass+=count # mass of current cluster
-            if (count==0) and (in_cluster): # end of cluster
-                clusters.append((lower,prev))
-                cluster_mass[(lower,prev)]=mass/total_mass
-                mass=0
-                in_cluster=False
-            elif (count!=0) and (not in_cluster): # start of cluster
-                lower=bound
-                in_cluster=True
-            prev=bound
-
-        if (in_cluster): # if last cluster runs over end of list
-            clusters.append((lower,prev))
-            cluster_mass[(lower,prev)]=mass/total_mass
-
-        # keep adding largest cluster until min_kept proportion is met
-        min_kept=min(1,min_kept)
-        new_splits=pd.Series(); stored_mass=0
-        while stored_mass<min_kept: # keep adding largest clusters
-            biggest_cluster=max(cluster_mass,key=cluster_mass.get)
-            new_splits=new_splits.append(splits.loc[biggest_cluster[0]:biggest_cluster[1]])
-            stored_mass+=cluster_mass[biggest_cluster]
-            del cluster_mass[biggest_cluster] # so cannot be added again
+        if len(splits)<2 or splits.sum()==0: return splits # nothing to clean
+        kept=GPSEvaluator.__densest_clusters(splits.values,min_kept)
 
         # fill in gaps
         width=splits.index[1]-splits.index[0]
-        for i in range(new_splits.index.min(),new_splits.index.max(),width):
-            if (i not in new_splits.index): new_splits=new_splits.append(pd.Series([0],index=[i]))
-        new_splits=new_splits.sort_index()
+        new_splits=splits[kept]
+        return new_splits.reindex(range(new_splits.index.min(),new_splits.index.max()+1,width),fill_value=0)
 
-        return new_splits
+    def __densest_clusters(counts:np.ndarray,min_kept:float) -> np.ndarray:
+        """
+        SUMMARY
+        find the bins in the largest clusters (runs of non-empty bins) which together hold min_kept% of all values
+
+        PARAMETERS
+        counts (numpy.ndarray): number of values in each bin
+        min_kept (float): minimum proportion of values kept
 
-    def split_histogram_data_per_km(df:pd.DataFrame,bin_width=10,sampling_dist=100,clean=False) -> pd.DataFrame:
+        RETURNS
+        numpy.ndarray: bool for each bin, True if it is in a kept cluster
+        """
+        non_empty=counts!=0
+        is_start=non_empty&~np.concatenate([[False],non_empty[:-1]]) # run-length encode non-empty bins
+        cluster=np.cumsum(is_start)-1 # cluster each bin is in (or follows)
+        mass=np.add.reduceat(counts,np.flatnonzero(is_start))/counts.sum()
+
+        # keep adding largest cluster until min_kept proportion is met (earliest first for equal clusters)
+        order=np.argsort(-mass,kind="stable")
+        num_kept=np.searchsorted(np.cumsum(mass[order]),min(1,min_kept),side="left")+1
+        return non_empty&np.isin(cluster,order[:num_kept])
+
+    def split_histogram_data_per_km(df:pd.DataFrame,bin_width=10,sampling_dist=100,clean=False,splits=None,moving=False) -> pd.DataFrame:
         """
         SUMMARY
         Generate histogram data for each km
@@ -285,32 +913,30 @@ class GPSEvaluator:
         bin_width (int): width of bin in seconds for seconds per km split
         sampling_dist (int): how often in metres to sample from the data set (default=100)
         clean (bool): remove extreme data
+        splits (pandas.DataFrame): GPSEvaluator.splits(df,split_dist=sampling_dist,moving=moving), if already calculated. pass `None` to calculate (default=None)
+        moving (bool): use time spent moving, so stops don't add slow splits (see GPSEvaluator.splits) (default=False)
 
         RETURNS
 	    pandas.DataFrame: column for each km, row for each split.
         """
         if (1000%sampling_dist!=0): return None # non-equal samples per km
 
-        split_data=GPSEvaluator.splits(df,split_dist=sampling_dist)["time"] # generalise data
-        split_data=split_data.apply(lambda x:x*(1000/sampling_dist)).astype(int) # extrapolate km splits
+        if splits is None: splits=GPSEvaluator.splits(df,split_dist=sampling_dist,moving=moving) # generalise data
+        split_data=splits["time"]
+        split_data=(split_data*(1000/sampling_dist)).astype(int) # extrapolate km splits
 
         samples_per_km=int(1000/sampling_dist)
         num_kms=floor(len(split_data)/samples_per_km)
 
-        bins={val:0 for val in range(floor(split_data.min()/bin_width)*bin_width,split_data.max()+1,bin_width)}
-        rows=[]
-        for i in range(num_kms+1):
-            local_bins=bins.copy()
-            slice=split_data.iloc[i*samples_per_km:(i+1)*samples_per_km]
-            for _,split in slice.iteritems(): local_bins[split]+=1
-            rows.append(local_bins)
-
-        split_df=pd.DataFrame(rows,index=["km_{}".format(i+1) for i in range(num_kms+1)]).transpose() #columns=["km_{}".format(i+1) for i in range(num_kms+1)]
+        lower_bounds,bin_indices=GPSEvaluator.__bin_indices(split_data.values,bin_width)
+        kms=np.arange(len(split_data))//samples_per_km
+        counts=np.bincount(kms*len(lower_bounds)+bin_indices,minlength=(num_kms+1)*len(lower_bounds)) # count (km,bin) pairs
+        split_df=pd.DataFrame(counts.reshape(num_kms+1,len(lower_bounds)).T,index=lower_bounds,columns=["km_{}".format(i+1) for i in range(num_kms+1)])
 
-        if clean: return GPSEvaluator.__clean_def_histogram_data_per_km(split_df)
+        if clean: return GPSEvaluator.clean_histogram_data_per_km(split_df)
         return split_df
 
-    def __clean_def_histogram_data_per_km(df:pd.DataFrame,min_kept=.9) -> pd.DataFrame:
+    def clean_histogram_data_per_km(df:pd.DataFrame,min_kept=.9) -> pd.DataFrame:
         """
         SUMMARY
         keeps densiest cluster which contains min_kept% of all values
@@ -321,46 +947,21 @@ class GPSEvaluator:
         RETURNS
     	pandas.DataFrame: cleaned data frame
         """
-        clusters=[]; cluster_mass={}
-        total_mass=df.values.sum()
-
-        lower=df.index[0]; in_cluster=True; mass=0; prev=None # prepare to record clusters
-        for bound,row in df.iterrows():
-            count=row.sum()
-            mass+=count # mass of current cluster
-            if (count==0) and (in_cluster): # end of cluster
-                clusters.append((lower,prev))
-                cluster_mass[(lower,prev)]=mass/total_mass
-                mass=0
-                in_cluster=False
-            elif (count!=0) and (not in_cluster): # start of cluster
-                lower=bound
-                in_cluster=True
-            prev=bound
-
-        if (in_cluster): # if last cluster runs over end of list
-            clusters.append((lower,prev))
-            cluster_mass[(lower,prev)]=mass/total_mass
-
-        # keep adding largest cluster until min_kept proportion is met
-        min_kept=min(1,min_kept)
-        new_df=pd.DataFrame(); stored_mass=0
-        while stored_mass<min_kept: # keep adding largest clusters
-            biggest_cluster=max(cluster_mass,key=cluster_mass.get)
-            new_df=pd.concat([new_df,df.loc[biggest_cluster[0]:biggest_cluster[1]]])
-            stored_mass+=cluster_mass[biggest_cluster]
-            del cluster_mass[biggest_cluster] # so cannot be added again
+        counts=df.values.sum(axis=1)
+        if len(df)<2 or counts.sum()==0: return df # nothing to clean
+        kept=GPSEvaluator.__densest_clusters(counts,min_kept)
 
         # fill in gaps
         width=df.index[1]-df.index[0]
-        empty_row=[0 for _ in range(df.shape[1])]
-        for i in range(new_df.index.min(),new_df.index.max(),width):
-            if (i not in new_df.index): new_df=new_df.append(pd.Series(empty_row,name=i,index=new_df.columns))
-        new_df=new_df.sort_index()
-
-        return new_df
+        new_df=df[kept]
+        return new_df.reindex(range(new_df.index.min(),new_df.index.max()+1,width),fill_value=0)
 
 if __name__=="__main__":
+    if "--compare-distances" in sys.argv: # error & speed of each distance model on the example files
+        examples=os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","examples")
+        print(GPSEvaluator.compare_distance_methods(sorted(os.path.join(examples,name) for name in os.listdir(examples))).to_string())
+        sys.exit()
+
     reader=GPSReader()
     data,metadata=reader.read("..\examples\Run_from_Exam.tcx")
     df=reader.data_to_dataframe(data)
@@ -1,163 +1,993 @@
-"""
-    TODO
-    other data sources (cadence etc)
-"""
+from concurrent.futures import FIRST_COMPLETED,ProcessPoolExecutor,wait
+from contextlib import contextmanager,ExitStack
+import copy
 from datetime import datetime
+import glob
+import gzip
+import mmap
+import numpy as np
+import os
 import pandas as pd
+import re
 import sys
+import traceback
+import zipfile
+
+from src.FITDecoder import FITDecoder
 
 """
 The difference between gpx & tcx data is that tcx includes calculation of distance to point
 """
 
+NAT=np.iinfo(np.int64).min # int64 value of numpy.datetime64("NaT"), marks a missing time
+
+# locates trackpoints, and the fields of each trackpoint, in the raw bytes of a gps file
+class TrackpointScanner:
+
+    WINDOW=1<<24 # bytes scanned at once. bounds the size of temporary arrays for very large files
+    TAG_END=np.frombuffer(b"> \t\r\n/",dtype=np.uint8) # bytes which can follow the name of a tag
+
+    def __init__(self,point:bytes,attributes:dict,fields:dict,metadata:dict):
+        """
+        SUMMARY
+        define how trackpoints, their fields and metadata are found.
+        the file is scanned as an array of bytes, so it is never decoded or split into lines.
+        used by GPSReader.read_gpx_columns & GPSReader.read_tcx_columns
+
+        PARAMETERS
+        point (bytes): name of trackpoint tag
+        attributes (dict(str:bytes)): fields stored as attributes of the trackpoint tag. name of field mapped to name of attribute
+        fields (dict(str:(list(bytes),str,bytes))): fields stored as the text of a tag inside a trackpoint.
+                                                   name of field mapped to (names the tag may have, type of value, name of tag which must directly precede it or None).
+                                                   type is one of ["float","time"]
+        metadata (dict(str:bytes)): name of each metadata field mapped to regex whose group 1 is the value.
+                                    only the section before the first trackpoint is searched
+        """
+        self.point=point
+        self.attributes=attributes
+        self.fields=fields
+        self.metadata={name:re.compile(pattern,re.DOTALL) for name,pattern in metadata.items()}
+
+    def project(self,columns:[str]):
+        """
+        SUMMARY
+        copy of this scanner which only parses some fields. tags of other fields are never matched & their values never converted.
+
+        PARAMETERS
+        columns (list(str)): names of fields to parse. pass `None` for every field
+
+        RETURNS
+        TrackpointScanner: scanner for requested fields (self if `columns` is None)
+        """
+        if columns is None: return self
+        scanner=copy.copy(self)
+        scanner.attributes={name:attribute for name,attribute in self.attributes.items() if name in columns}
+        scanner.fields={name:field for name,field in self.fields.items() if name in columns}
+        return scanner
+
+    def scan(self,buf,decode_times) -> (dict,dict):
+        """
+        SUMMARY
+        find every trackpoint in `buf` and parse the value of each field.
+        the buffer is scanned in windows (of TrackpointScanner.WINDOW bytes) which end at the start of a trackpoint.
+
+        PARAMETERS
+        buf (bytes/mmap.mmap): contents of gps file
+        decode_times (function): parses an array of timestamps to epoch nanoseconds (GPSReader.decode_times)
+
+        RETURNS
+        dict(str:numpy.ndarray): values of each field, one entry per trackpoint.
+                                 missing values are NaN (or NAT for "time"). fields missing from every trackpoint are dropped.
+        dict(str:bytes): unparsed metadata values
+        """
+        point_tag=b"<"+self.point
+        first_point=buf.find(point_tag)
+        metadata=self.scan_metadata(buf,len(buf) if first_point==-1 else first_point)
+
+        windows=[]; pos=0
+        while pos<len(buf):
+            end=min(pos+self.WINDOW,len(buf))
+            if end<len(buf): # end window at start of a trackpoint
+                cut=buf.rfind(point_tag,pos+1,end)
+                if cut==-1: cut=buf.find(point_tag,end) # trackpoint longer than window
+                end=len(buf) if cut==-1 else cut
+            windows.append(self.scan_window(np.frombuffer(buf,dtype=np.uint8,count=end-pos,offset=pos),decode_times))
+            pos=end
+
+        return self.concat(windows),metadata
+
+    def scan_stream(self,stream,decode_times,block_size=WINDOW):
+        """
+        SUMMARY
+        scan a file as it is read, one window at a time. only the current block and any incomplete trackpoint are kept in memory.
+
+        PARAMETERS
+        stream (file): binary file object to read from
+        decode_times (function): parses an array of timestamps to epoch nanoseconds (GPSReader.decode_times)
+        block_size (int): number of bytes to read at a time (default=TrackpointScanner.WINDOW)
+
+        YIELDS
+        dict(str:numpy.ndarray): values of each field for the trackpoints in the window (see TrackpointScanner.scan)
+        dict(str:bytes): unparsed metadata values (same for every window)
+        """
+        point_tag=b"<"+self.point
+        buf=bytearray(); metadata=None; eof=False
+        while not eof:
+            block=stream.read(block_size)
+            eof=len(block)==0
+            buf+=block
+            if metadata is None: # metadata is before the first trackpoint
+                first_point=buf.find(point_tag)
+                if first_point==-1 and not eof: continue
+                metadata=self.scan_metadata(buf,len(buf) if first_point==-1 else first_point)
+
+            end=len(buf) if eof else buf.rfind(point_tag,1) # keep last (possibly incomplete) trackpoint for next window
+            if end<=0: continue
+            columns=self.scan_window(np.frombuffer(buf,dtype=np.uint8,count=end),decode_times)
+            del buf[:end]
+            yield columns,metadata
+
+    def scan_metadata(self,buf,end:int) -> dict:
+        """
+        SUMMARY
+        search the section of a file before the first trackpoint for metadata
+
+        PARAMETERS
+        buf (bytes/mmap.mmap): contents of gps file
+        end (int): position of first trackpoint
+
+        RETURNS
+        dict(str:bytes): unparsed metadata values
+        """
+        metadata={}
+        for name,pattern in self.metadata.items():
+            match=pattern.search(buf,0,end)
+            if match is not None: metadata[name]=match.group(1)
+        return metadata
+
+    def scan_window(self,data:np.ndarray,decode_times) -> dict:
+        """
+        SUMMARY
+        find every trackpoint in a window of a file & parse its fields. every operation is on whole arrays.
+        values are matched to trackpoints by position, so readings missing a field (or fields outside of trackpoints) don't misalign columns.
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of the window
+        decode_times (function): parses an array of timestamps to epoch nanoseconds (GPSReader.decode_times)
+
+        RETURNS
+        dict(str:numpy.ndarray): values of each field, one entry per trackpoint (see TrackpointScanner.scan)
+        """
+        opens=np.flatnonzero(data==ord("<")) # position of every tag
+        closes=np.flatnonzero(data==ord(">"))
+        if len(opens)==0 or len(closes)==0: return {}
+        names=data[np.minimum(opens+1,len(data)-1)] # first byte of every tag's name
+
+        # trackpoint boundaries
+        starts=opens[self.__match_tags(data,opens,names,self.point)]
+        if len(starts)==0: return {}
+        start_ends=closes[np.minimum(np.searchsorted(closes,starts),len(closes)-1)] # ">" of each trackpoint's opening tag
+        ends=start_ends.copy()
+        point_closes=opens[self.__match_tags(data,opens,names,b"/"+self.point)]
+        if len(point_closes)>0: # trackpoint ends at the first closing tag after it opens (unless self-closing)
+            after=np.searchsorted(point_closes,starts)
+            has_close=(data[start_ends-1]!=ord("/"))&(after<len(point_closes))
+            ends[has_close]=point_closes[after[has_close]]
+
+        columns={}
+        for name,attribute in self.attributes.items():
+            value_starts,value_ends=self.__find_attribute(data,starts,start_ends,attribute)
+            has_value=value_starts>=0
+            if has_value.any():
+                column=np.full(len(starts),np.nan)
+                column[has_value]=self.__values(data,value_starts[has_value],value_ends[has_value]).astype(np.float64)
+                columns[name]=column
+
+        for name,(tags,kind,parent) in self.fields.items():
+            found=np.concatenate([self.__match_tags(data,opens,names,tag) for tag in tags])
+            if parent is not None: # tag must directly follow parent tag
+                is_parent=np.zeros(len(opens),dtype=bool)
+                is_parent[self.__match_tags(data,opens,names,parent)]=True
+                found=found[(found>0)&is_parent[found-1]]
+            if len(found)==0: continue
+
+            # match each value to the trackpoint it falls in
+            positions=opens[found]
+            point=np.searchsorted(starts,positions,side="right")-1
+            inside=point>=0
+            inside[inside]=positions[inside]<ends[point[inside]]
+            if not inside.any(): continue
+            found=found[inside]; point=point[inside]
+
+            value_starts=closes[np.minimum(np.searchsorted(closes,opens[found]),len(closes)-1)]+1
+            value_ends=np.append(opens,len(data))[found+1] # value ends at next tag
+            raw=self.__values(data,value_starts,value_ends)
+            if kind=="time":
+                column=np.full(len(starts),NAT,dtype=np.int64)
+                column[point]=decode_times(np.char.strip(raw))
+            else:
+                column=np.full(len(starts),np.nan)
+                column[point]=raw.astype(np.float64) # parsed from bytes by numpy
+            columns[name]=column
+
+        return columns
+
+    def __match_tags(self,data:np.ndarray,opens:np.ndarray,names:np.ndarray,name:bytes) -> np.ndarray:
+        """
+        SUMMARY
+        find tags with a given name
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of the window
+        opens (numpy.ndarray): position of every "<" in `data`
+        names (numpy.ndarray): byte following each "<"
+        name (bytes): name of tag (including any namespace prefix)
+
+        RETURNS
+        numpy.ndarray: indices (into `opens`) of matching tags
+        """
+        found=np.flatnonzero(names==name[0])
+        found=found[opens[found]+len(name)+1<len(data)]
+        for offset,byte in enumerate(name[1:],1): # filter candidates one byte at a time
+            found=found[data[opens[found]+1+offset]==byte]
+        return found[np.isin(data[opens[found]+1+len(name)],self.TAG_END)]
+
+    def __find_attribute(self,data:np.ndarray,starts:np.ndarray,start_ends:np.ndarray,attribute:bytes) -> (np.ndarray,np.ndarray):
+        """
+        SUMMARY
+        locate the value of an attribute in each trackpoint's opening tag
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of the window
+        starts (numpy.ndarray): position of each trackpoint's opening "<"
+        start_ends (numpy.ndarray): position of each trackpoint's opening ">"
+        attribute (bytes): name of attribute
+
+        RETURNS
+        numpy.ndarray: position of the start of each value (-1 if trackpoint doesn't have the attribute)
+        numpy.ndarray: position of the end of each value
+        """
+        # each opening tag as a row of a 2D array
+        width=int((start_ends-starts).max())+1
+        cells=starts[:,None]+np.arange(width)
+        tags=data[np.minimum(cells,len(data)-1)].copy()
+        tags[cells>start_ends[:,None]]=0
+
+        key=np.frombuffer(attribute+b"=",dtype=np.uint8)
+        span=width-len(key)
+        if span<=1: return np.full(len(starts),-1),np.full(len(starts),-1)
+        found=np.isin(tags[:,:span],np.frombuffer(b" \t\r\n",dtype=np.uint8)) # name must follow whitespace
+        for offset,byte in enumerate(key): found&=tags[:,1+offset:1+offset+span]==byte
+        has_attribute=found.any(axis=1)
+        value_start=found.argmax(axis=1)+len(key)+2 # skip whitespace, name, "=" and opening quote
+
+        is_quote=(tags==ord('"'))|(tags==ord("'"))
+        is_quote[np.arange(width)[None,:]<value_start[:,None]]=False
+        value_end=is_quote.argmax(axis=1)
+        has_attribute&=is_quote.any(axis=1)
+
+        return np.where(has_attribute,starts+value_start,-1),starts+value_end
+
+    def __values(self,data:np.ndarray,starts:np.ndarray,ends:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        copy the bytes between each start & end into a fixed width byte string array
+
+        PARAMETERS
+        data (numpy.ndarray): uint8 view of the window
+        starts (numpy.ndarray): position of first byte of each value
+        ends (numpy.ndarray): position after last byte of each value
+
+        RETURNS
+        numpy.ndarray: bytes of each value (dtype "S")
+        """
+        width=int(min(max((ends-starts).max(),1),64)) # values longer than 64 bytes are truncated
+        cells=starts[:,None]+np.arange(width)
+        values=data[np.minimum(cells,len(data)-1)].copy()
+        values[cells>=ends[:,None]]=0 # null padding
+        return np.ascontiguousarray(values).view("S{}".format(width)).ravel()
+
+    def concat(self,windows:[dict]) -> dict:
+        """
+        SUMMARY
+        join the columns scanned from consecutive windows. fields missing from a window are filled as missing.
+
+        PARAMETERS
+        windows (list(dict(str:numpy.ndarray))): columns from TrackpointScanner.scan_window
+
+        RETURNS
+        dict(str:numpy.ndarray): joined columns
+        """
+        names=[name for name in list(self.attributes)+list(self.fields) if any(name in window for window in windows)]
+        columns={}
+        for name in names:
+            missing=NAT if (name in self.fields and self.fields[name][1]=="time") else np.nan
+            parts=[]
+            for window in windows:
+                length=len(next(iter(window.values()))) if len(window)>0 else 0
+                parts.append(window[name] if name in window else np.full(length,missing,dtype=np.int64 if missing is NAT else np.float64))
+            columns[name]=np.concatenate(parts)
+        return columns
+
 class GPSReader:
 
+    VERSION=2 # increase whenever parsed output changes, so cached activities are re-parsed (see ActivityCache)
+
+    # dtype of each field in columnar data, and the value which marks a missing reading (see GPSReader.apply_schema)
+    SCHEMA={
+        "position_lat":(np.float64,np.nan),
+        "position_lon":(np.float64,np.nan),
+        "altitude":(np.float32,np.nan),
+        "distance_to_point":(np.float32,np.nan),
+        "time":(np.int64,NAT), # epoch nanoseconds
+        "heart_rate":(np.uint8,0xFF),
+        "cadence":(np.uint8,0xFF),
+        "power":(np.uint16,0xFFFF),
+        "temperature":(np.float32,np.nan)
+    }
+
+    # where fields are in each file type (see TrackpointScanner)
+    GPX_SCANNER=TrackpointScanner(
+        point=b"trkpt",
+        attributes={"position_lat":b"lat","position_lon":b"lon"},
+        fields={
+            "altitude":([b"ele"],"float",None),
+            "time":([b"time"],"time",None),
+            "heart_rate":([b"gpxtpx:hr",b"ns3:hr",b"hr"],"float",None),
+            "cadence":([b"gpxtpx:cad",b"ns3:cad",b"cad"],"float",None),
+            "power":([b"power",b"gpxpx:PowerInWatts",b"pwr:PowerInWatts"],"float",None),
+            "temperature":([b"gpxtpx:atemp",b"ns3:atemp",b"atemp"],"float",None)
+        },
+        metadata={
+            "date":rb"<metadata\b.*?<time>\s*([^<\s]+)\s*<",
+            "sport":rb"<type>\s*([^<]+?)\s*<"
+        })
+    TCX_SCANNER=TrackpointScanner(
+        point=b"Trackpoint",
+        attributes={},
+        fields={
+            "time":([b"Time"],"time",None),
+            "position_lat":([b"LatitudeDegrees"],"float",None),
+            "position_lon":([b"LongitudeDegrees"],"float",None),
+            "altitude":([b"AltitudeMeters"],"float",None),
+            "distance_to_point":([b"DistanceMeters"],"float",None),
+            "heart_rate":([b"Value"],"float",b"HeartRateBpm"),
+            "cadence":([b"Cadence",b"ns3:RunCadence",b"RunCadence"],"float",None),
+            "power":([b"ns3:Watts",b"Watts"],"float",None)
+        },
+        metadata={
+            "sport":rb"<Activity\s+Sport=[\"']([^\"']*)[\"']",
+            "date":rb"<Id>\s*([^<\s]+)\s*<"
+        })
+
     # read datafiles to dictionaries
-    def read(self,path:str) -> ([dict],dict):
+    def read(self,path:str,columnar=False,member=None,columns=None) -> ([dict],dict):
         """
         SUMMARY
         Parse data from gps files.
-        Supports .tcx and .gpx files
+        Supports .tcx, .gpx and .fit files, which may be gzipped (.tcx.gz, .gpx.gz, .fit.gz) and/or in a .zip archive
 
         PARAMETERS
-	    path (str): path to file to read
+	    path (str): path to file to read (or to .zip archive containing it)
+        columnar (bool): return a numpy array per field instead of a dict per reading. (default=False)
+                         see GPSReader.read_gpx_columns, GPSReader.read_tcx_columns & GPSReader.read_fit_columns
+        member (str): name of file to read from inside the .zip archive at `path`. pass `None` if `path` isn't an archive (default=None)
+                      see GPSReader.archive_members
+        columns (list(str)): names of fields to parse (eg ["position_lat","position_lon"]), other fields are skipped. pass `None` for every field (default=None)
 
         RETURNS
 	    list(dict): dictionary of data extracted from each reading
+                    (dict(str:numpy.ndarray) if `columnar`)
         dict: metadata
         """
-        extension=path[-4:]
-        if (extension==".gpx"): return self.read_gpx(path)
-        if (extension==".tcx"): return self.read_tcx(path)
+        file_type=self.file_type(path if member is None else member)
+        if (file_type=="gpx"): return self.read_gpx_columns(path,member,columns) if columnar else self.read_gpx(path,member,columns)
+        if (file_type=="tcx"): return self.read_tcx_columns(path,member,columns) if columnar else self.read_tcx(path,member,columns)
+        if (file_type=="fit"): return self.read_fit_columns(path,member,columns) if columnar else self.read_fit(path,member,columns)
         return -1, -1 # unrecognised file type
 
-    def read_gpx(self,path:str) -> ([dict],dict):
+    def file_type(self,name:str) -> str:
+        """
+        SUMMARY
+        Determine the type of a gps file from its name. A ".gz" extension is ignored.
+
+        PARAMETERS
+        name (str): name or path of file
+
+        RETURNS
+        str: one of ["gpx","tcx","fit"] (None if unsupported)
+        """
+        name=name.lower()
+        if name.endswith(".gz"): name=name[:-3]
+        extension=name[-4:]
+        if (extension==".gpx"): return "gpx"
+        if (extension==".tcx"): return "tcx"
+        if (extension==".fit"): return "fit"
+        return None
+
+    def archive_members(self,path:str) -> [str]:
+        """
+        SUMMARY
+        List the gps files in a .zip archive (eg a Strava bulk export), which can be read with GPSReader.read(path,member=...)
+
+        PARAMETERS
+        path (str): path to .zip archive
+
+        RETURNS
+        list(str): names of supported files in the archive
+        """
+        with zipfile.ZipFile(path) as archive:
+            return [name for name in archive.namelist() if self.file_type(name) is not None]
+
+    def read_gpx(self,path:str,member=None,columns=None) -> ([dict],dict):
         """
         SUMMARY
         Parse data from .gpx files.
 
         PARAMETERS
 	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
 
         RETURNS
 	    list(dict): dictionary of data extracted from each reading
-                    fields include ["position_lat":float,"position_lon":float,"altitude":float,"time":datetime.datetime,"hr":int]
+                    fields include ["position_lat":float,"position_lon":float,"altitude":float,"time":datetime.datetime,"heart_rate":int,
+                                    "cadence":int,"power":int,"temperature":float]
         dict: metadata
               fields include ["sport":str,"date":datetime.datetime]
         """
-        f=open(path,"r")
-        it=iter(f) # iterate line by line
-        data=[]; metadata={}
-        in_metadata=False; datum={}
-        type_dict={1:"Cycling",9:"Running"}
-
-        for line in it:
-            line=line.strip("\n").strip() # Remove trailing new line and preceeding white spaces
-
-            if "</trkpt>" in line: # end of gpspoint
-                data.append(datum)
-            elif "<trkpt" in line: # start of gpspoint (lat,lon)
-                datum={}
-                spl=line.split("\"")
-                datum["position_lat"]=float(spl[1])
-                datum["position_lon"]=float(spl[3])
-            elif "<ele>" in line:
-                elevation=line.replace("<ele>",'').replace("</ele>",'')
-                datum["altitude"]=float(elevation)
-            elif "<time>" in line:
-                time=datetime.strptime(line.replace("<time>","").replace("</time>",""),"%Y-%m-%dT%H:%M:%SZ")
-                if in_metadata: metadata["date"]=time
-                else: datum["time"]=time
-            elif "<gpxtpx:hr>" in line:
-                hr=line.replace("<gpxtpx:hr>",'').replace("</gpxtpx:hr>",'')
-                datum["heart_rate"]=int(hr)
-            elif "<type>" in line:
-                type=int(line.replace("<type>","").replace("</type>",""))
-                if type in type_dict: metadata["sport"]=type_dict[type]
-                else: metadata["sport"]=type
-            elif "<metadata>" in line:
-                in_metadata=True
-            elif "</metadata>" in line:
-                in_metadata=False
-
-        return data,metadata
-
-    def read_tcx(self, path) -> ([dict],dict):
+        columns,metadata=self.read_gpx_columns(path,member,columns)
+        return self.__columns_to_data(columns),metadata
+
+    def read_tcx(self,path:str,member=None,columns=None) -> ([dict],dict):
         """
         SUMMARY
         Parse data from .tcx files.
 
         PARAMETERS
 	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
 
         RETURNS
 	    list(dict): dictionary of data extracted from each reading
-                    fields include ["position_lat":float,"position_lon":float,"altitude":float,"time":datetime.datetime,"distance_to_point":float,"hr":int]
+                    fields include ["position_lat":float,"position_lon":float,"altitude":float,"time":datetime.datetime,"distance_to_point":float,"heart_rate":int,
+                                    "cadence":int,"power":int]
+        dict: metadata
+              fields include ["sport":str,"date":datetime.datetime]
+        """
+        columns,metadata=self.read_tcx_columns(path,member,columns)
+        return self.__columns_to_data(columns),metadata
+
+    def read_gpx_columns(self,path:str,member=None,columns=None) -> (dict,dict):
+        """
+        SUMMARY
+        Parse data from .gpx files into a numpy array per field.
+        Same fields as GPSReader.read_gpx but without building a dict for each reading.
+
+        PARAMETERS
+	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        RETURNS
+	    dict(str:numpy.ndarray): values of each field, one entry per reading
+                                 fields include ["position_lat","position_lon","altitude","time","heart_rate","cadence","power","temperature"]
+                                 dtypes & missing values are given by GPSReader.SCHEMA. fields missing from every reading are dropped.
+        dict: metadata
+              fields include ["sport":str,"date":datetime.datetime]
+        """
+        columns,raw_metadata=self.__scan_file(path,member,self.GPX_SCANNER.project(columns))
+        return self.apply_schema(columns),self.__gpx_metadata(raw_metadata)
+
+    def read_tcx_columns(self,path:str,member=None,columns=None) -> (dict,dict):
+        """
+        SUMMARY
+        Parse data from .tcx files into a numpy array per field.
+        Same fields as GPSReader.read_tcx but without building a dict for each reading.
+
+        PARAMETERS
+	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        RETURNS
+	    dict(str:numpy.ndarray): values of each field, one entry per reading
+                                 fields include ["position_lat","position_lon","altitude","time","distance_to_point","heart_rate","cadence","power"]
+                                 dtypes & missing values are given by GPSReader.SCHEMA. fields missing from every reading are dropped.
+        dict: metadata
+              fields include ["sport":str,"date":datetime.datetime]
+        """
+        columns,raw_metadata=self.__scan_file(path,member,self.TCX_SCANNER.project(columns))
+        return self.apply_schema(columns),self.__tcx_metadata(raw_metadata)
+
+    def read_fit(self,path:str,member=None,columns=None) -> ([dict],dict):
+        """
+        SUMMARY
+        Parse data from .fit files.
+
+        PARAMETERS
+	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        RETURNS
+	    list(dict): dictionary of data extracted from each reading
+                    fields include ["position_lat":float,"position_lon":float,"altitude":float,"time":datetime.datetime,"distance_to_point":float,
+                                    "heart_rate":int,"cadence":int,"power":int,"temperature":float]
+        dict: metadata
+              fields include ["sport":str,"date":datetime.datetime]
+        """
+        columns,metadata=self.read_fit_columns(path,member,columns)
+        return self.__columns_to_data(columns),metadata
+
+    def read_fit_columns(self,path:str,member=None,columns=None) -> (dict,dict):
+        """
+        SUMMARY
+        Parse data from .fit files into a numpy array per field (see FITDecoder.decode).
+        The binary records are read straight into the same columns as GPSReader.read_gpx_columns & GPSReader.read_tcx_columns.
+
+        PARAMETERS
+	    path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        RETURNS
+	    dict(str:numpy.ndarray): values of each field, one entry per reading
+                                 fields include ["position_lat","position_lon","altitude","time","distance_to_point","heart_rate","cadence","power","temperature"]
+                                 dtypes & missing values are given by GPSReader.SCHEMA. fields missing from every reading are dropped.
         dict: metadata
               fields include ["sport":str,"date":datetime.datetime]
         """
-        f=open(path,"r")
-        it=iter(f)
-
-        data=[]; metadata={};
-        trackpoints=False
-
-        for line in it:
-            line=line.strip("\n").strip() # Remove trailing new line and preceeding white spaces
-
-            # Activity Metadata
-            if "<Activity" in line:
-                metadata["sport"]=line.strip('<Activity Sport="').rstrip('">"')
-            elif "<Id>" in line and "</Id>" in line:
-                date_str=line.replace("<Id>","").replace("</Id>","")
-                metadata["date"]=datetime.strptime(date_str,"%Y-%m-%dT%H:%M:%SZ")
-
-            # Lap data
-            elif "<Track>" in line:
-                trackpoints=True
-            elif "</Track>" in line:
-                trackpoints=False
-            elif trackpoints and "<Trackpoint>" in line:
-                datum={}
-            elif trackpoints and "</Trackpoint>" in line:
-                data.append(datum)
-            elif trackpoints and "<Time>" in line and "</Time>" in line:
-                datum["time"]=datetime.strptime(line.replace("<Time>","").replace("</Time>",""),"%Y-%m-%dT%H:%M:%SZ")
-            elif trackpoints and "<Position>" in line:
-                line=next(it)
-                lat=float(line.strip().replace("<LatitudeDegrees>","").replace("</LatitudeDegrees>",""))
-                line=next(it)
-                lon=float(line.strip().replace("<LongitudeDegrees>","").replace("</LongitudeDegrees>",""))
-                line=next(it)
-
-                datum["position_lat"]=lat
-                datum["position_lon"]=lon
-
-            elif trackpoints and "<AltitudeMeters>" in line and "</AltitudeMeters>" in line:
-                datum["altitude"]=float(line.replace("<AltitudeMeters>","").replace("</AltitudeMeters>",""))
-            elif trackpoints and "<DistanceMeters>" in line and "</DistanceMeters>" in line:
-                datum["distance_to_point"]=float(line.replace("<DistanceMeters>","").replace("</DistanceMeters>",""))
-            elif trackpoints and "<HeartRateBpm>" in line:
-                line=next(it)
-                datum["heart_rate"]=int(line.strip().replace("<Value>","").replace("</Value>",""))
-
-        return data,metadata
+        if (member is not None) or path.lower().endswith(".gz"):
+            with self.__open_stream(path,member) as stream: columns,metadata=FITDecoder().decode(stream.read(),columns)
+        else:
+            columns,metadata=self.__map_file(path,lambda buf:FITDecoder().decode(buf,columns))
+
+        if "date" in metadata: metadata["date"]=self.__to_datetimes(np.array([metadata["date"]],dtype=np.int64))[0]
+        return self.apply_schema(columns),metadata
+
+    def iter_chunks(self,path:str,chunk_points=10000,columnar=False,member=None,columns=None):
+        """
+        SUMMARY
+        Parse data from gps files in chunks of a fixed number of readings.
+        The file is read a block at a time, so memory use does not depend on the length of the activity.
+        Supports the same files as GPSReader.read
+
+        PARAMETERS
+        path (str): path to file to read
+        chunk_points (int): number of readings in each chunk. the last chunk may be shorter (default=10000)
+        columnar (bool): yield a numpy array per field (see GPSReader.read_gpx_columns) rather than a pandas.DataFrame (default=False)
+        member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        YIELDS
+        pandas.DataFrame: readings in chunk. index continues from the previous chunk.
+                          fields missing from every reading in a chunk are left out.
+                          (dict(str:numpy.ndarray) if `columnar`)
+        dict: metadata
+        """
+        file_type=self.file_type(path if member is None else member)
+        if (file_type=="gpx"): scanner,parse_metadata=self.GPX_SCANNER.project(columns),self.__gpx_metadata
+        elif (file_type=="tcx"): scanner,parse_metadata=self.TCX_SCANNER.project(columns),self.__tcx_metadata
+        elif (file_type=="fit"): # binary records are compact, so are decoded at once
+            columns,metadata=self.read_fit_columns(path,member,columns)
+            num_readings=len(next(iter(columns.values()))) if len(columns)>0 else 0
+            for start in range(0,num_readings,chunk_points):
+                yield self.__chunk({name:values[start:start+chunk_points] for name,values in columns.items()},start,columnar),metadata
+            return
+        else: return # unrecognised file type
+
+        with self.__open_stream(path,member) as f:
+            pending=[]; num_pending=0; num_read=0; metadata=None
+            for columns,raw_metadata in scanner.scan_stream(f,self.decode_times,block_size=1<<20): # small blocks keep memory use low
+                if metadata is None: metadata=parse_metadata(raw_metadata)
+                if len(columns)==0: continue
+                pending.append(columns); num_pending+=len(next(iter(columns.values())))
+                if num_pending<chunk_points: continue
+
+                # split into full chunks, keeping any remainder for the next window
+                columns=scanner.concat(pending)
+                for start in range(0,num_pending-chunk_points+1,chunk_points):
+                    yield self.__chunk({name:values[start:start+chunk_points] for name,values in columns.items()},num_read,columnar),metadata
+                    num_read+=chunk_points
+                remainder=num_pending%chunk_points
+                pending=[{name:values[num_pending-remainder:].copy() for name,values in columns.items()}] if remainder>0 else []
+                num_pending=remainder
+
+            if num_pending>0: yield self.__chunk(scanner.concat(pending),num_read,columnar),metadata
+
+    def read_many(self,paths,max_workers=None,max_pending=None,columns=None):
+        """
+        SUMMARY
+        Parse many gps files at once, spread across a pool of processes.
+        Files inside .zip archives are each parsed separately.
+
+        PARAMETERS
+        paths (str/list(str)): path to a directory, a glob pattern (eg "activities/*.gpx.gz") or a list of paths to files.
+                               unsupported files in a directory or matching a glob are skipped.
+        max_workers (int): number of processes to use. pass `None` to use one per cpu (default=None)
+        max_pending (int): maximum number of files parsed but not yet yielded, which limits memory use. pass `None` for 4 per process (default=None)
+        columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+        YIELDS
+        str: path of file (joined with name of file inside archive, for .zip archives)
+        pandas.DataFrame: data from GPSReader.read (`None` if file could not be read)
+        dict: metadata from GPSReader.read (`{"error":exception}`, with the exception raised, if file could not be read)
+              files are yielded as they are parsed, not in the order given.
+        """
+        if isinstance(paths,str):
+            paths=sorted(os.path.join(paths,name) for name in os.listdir(paths)) if os.path.isdir(paths) else sorted(glob.glob(paths))
+            paths=[path for path in paths if path.lower().endswith(".zip") or (self.file_type(path) is not None)]
+
+        tasks=[] # (name,path,member) of each file to parse
+        for path in paths:
+            if path.lower().endswith(".zip"):
+                try: tasks.extend((os.path.join(path,member),path,member) for member in self.archive_members(path))
+                except Exception as e: yield path,None,{"error":e} # unreadable archive
+            else: tasks.append((path,path,None))
+
+        max_workers=max_workers if (max_workers is not None) else os.cpu_count()
+        max_pending=max_pending if (max_pending is not None) else 4*max_workers
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            tasks=iter(tasks); pending={}
+            while True:
+                for name,path,member in tasks: # keep at most max_pending files parsing
+                    pending[executor.submit(read_dataframe,path,member,columns)]=name
+                    if len(pending)>=max_pending: break
+                if len(pending)==0: break
+
+                done,_=wait(pending,return_when=FIRST_COMPLETED)
+                for future in done:
+                    name=pending.pop(future)
+                    try: df,metadata=future.result()
+                    except Exception as e: yield name,None,{"error":e}
+                    else: yield name,df,metadata
+
+    def __chunk(self,columns:dict,start:int,columnar:bool):
+        """
+        SUMMARY
+        format a chunk yielded by GPSReader.iter_chunks
+
+        PARAMETERS
+        columns (dict(str:numpy.ndarray)): values of each field in chunk
+        start (int): number of readings in previous chunks
+        columnar (bool): whether to return `columns` as they are
+
+        RETURNS
+        pandas.DataFrame: chunk, indexed from `start` (`columns` if `columnar`)
+        """
+        columns=self.apply_schema(columns)
+        if columnar: return columns
+        df=self.columns_to_dataframe(columns)
+        df.index=pd.RangeIndex(start,start+len(df))
+        return df
+
+    def __gpx_metadata(self,raw_metadata:dict) -> dict:
+        """
+        SUMMARY
+        parse metadata scanned from a .gpx file
+
+        PARAMETERS
+        raw_metadata (dict(str:bytes)): unparsed metadata from GPSReader.GPX_SCANNER
+
+        RETURNS
+        dict: metadata. fields include ["sport":str,"date":datetime.datetime]
+        """
+        metadata={}
+        if "date" in raw_metadata: metadata["date"]=self.__to_datetimes(self.decode_times([raw_metadata["date"]]))[0]
+        if "sport" in raw_metadata:
+            type_dict={1:"Cycling",9:"Running"}
+            type=raw_metadata["sport"].decode()
+            type=int(type) if type.isdigit() else type
+            metadata["sport"]=type_dict[type] if type in type_dict else type
+        return metadata
+
+    def __tcx_metadata(self,raw_metadata:dict) -> dict:
+        """
+        SUMMARY
+        parse metadata scanned from a .tcx file
+
+        PARAMETERS
+        raw_metadata (dict(str:bytes)): unparsed metadata from GPSReader.TCX_SCANNER
+
+        RETURNS
+        dict: metadata. fields include ["sport":str,"date":datetime.datetime]
+        """
+        metadata={}
+        if "sport" in raw_metadata: metadata["sport"]=raw_metadata["sport"].decode()
+        if "date" in raw_metadata: metadata["date"]=self.__to_datetimes(self.decode_times([raw_metadata["date"]]))[0]
+        return metadata
+
+    def __scan_file(self,path:str,member:str,scanner:TrackpointScanner) -> (dict,dict):
+        """
+        SUMMARY
+        memory-map a file and scan it. the file is never read into python strings.
+        compressed files & archive members are decompressed as they are scanned, without being written to disk.
+
+        PARAMETERS
+        path (str): path to file to read
+        member (str): name of file inside .zip archive at `path` (None if not an archive)
+        scanner (TrackpointScanner): GPSReader.GPX_SCANNER or GPSReader.TCX_SCANNER
+
+        RETURNS
+        dict(str:numpy.ndarray): values of each field (see TrackpointScanner.scan)
+        dict(str:bytes): unparsed metadata
+        """
+        if (member is not None) or path.lower().endswith(".gz"):
+            windows=[]; metadata={}
+            with self.__open_stream(path,member) as stream:
+                for columns,metadata in scanner.scan_stream(stream,self.decode_times): windows.append(columns)
+            return scanner.concat(windows),metadata
+
+        return self.__map_file(path,lambda buf:scanner.scan(buf,self.decode_times))
+
+    def __map_file(self,path:str,parse):
+        """
+        SUMMARY
+        memory-map a file and parse it. an error raised while parsing is re-raised once the map is closed,
+        as numpy views of the map held by its traceback would otherwise stop the map closing (raising BufferError in place of the real error).
+
+        PARAMETERS
+        path (str): path to file to read
+        parse (function): parses the contents of the file (bytes/mmap.mmap). results must not hold views of the map
+
+        RETURNS
+        result of `parse`
+        """
+        with open(path,"rb") as f:
+            if f.seek(0,2)==0: return parse(b"") # empty files cannot be mapped
+            error=None
+            with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as buf:
+                try: return parse(buf)
+                except Exception as e:
+                    error=e
+                    while e is not None: # release views held by frames of the error (and any errors it was raised from)
+                        traceback.clear_frames(e.__traceback__); e=e.__cause__ or e.__context__
+            raise error
+
+    @contextmanager
+    def __open_stream(self,path:str,member=None):
+        """
+        SUMMARY
+        open a gps file for reading as a binary stream. gzipped files & archive members are decompressed as the stream is read.
+
+        PARAMETERS
+        path (str): path to file (or to .zip archive containing it)
+        member (str): name of file inside .zip archive at `path`. pass `None` if `path` isn't an archive (default=None)
+
+        YIELDS
+        file: binary stream of (decompressed) file contents
+        """
+        with ExitStack() as stack:
+            if member is None: stream=stack.enter_context(open(path,"rb"))
+            else: stream=stack.enter_context(stack.enter_context(zipfile.ZipFile(path)).open(member))
+            if (path if member is None else member).lower().endswith(".gz"): stream=stack.enter_context(gzip.GzipFile(fileobj=stream))
+            yield stream
+
+    def __columns_to_data(self,columns:dict) -> [dict]:
+        """
+        SUMMARY
+        convert columnar data to a dict per reading. missing values are left out of each dict.
+        used by GPSReader.read_gpx & GPSReader.read_tcx
+
+        PARAMETERS
+        columns (dict(str:numpy.ndarray)): data from GPSReader.read_gpx_columns or GPSReader.read_tcx_columns
+
+        RETURNS
+        list(dict): dictionary of data from each reading
+        """
+        values={}; present={}
+        for name,column in columns.items():
+            present[name]=(~self.missing(name,column)).tolist()
+            if name=="time": values[name]=self.__to_datetimes(column)
+            elif column.dtype==np.float32: values[name]=column.astype(str).astype(np.float64).tolist() # shortest decimal, so 51.8 isn't 51.799999237
+            else: values[name]=column.tolist()
+
+        num_readings=len(next(iter(columns.values()))) if len(columns)>0 else 0
+        return [{name:values[name][i] for name in columns if present[name][i]} for i in range(num_readings)]
+
+
+    """
+    TIMESTAMPS
+    """
+    def decode_times(self,raw:[str]) -> np.ndarray:
+        """
+        SUMMARY
+        Parse ISO 8601 timestamps ("YYYY-MM-DDTHH:MM:SS[.fff][Z|+HH:MM|-HH:MM]") in a single vectorised pass.
+        Timestamps without a zone are assumed to be UTC.
+        All timestamps are viewed as a fixed width byte array so no per timestamp parsing is done in python.
+
+        PARAMETERS
+        raw (list(str)): timestamps to parse
+
+        RETURNS
+        numpy.ndarray: int64 nanoseconds since the unix epoch (UTC), one for each timestamp
+        """
+        if len(raw)==0: return np.empty(0,dtype=np.int64)
+        chars=np.array(raw,dtype="S") # fixed width (padded with null bytes)
+        width=chars.dtype.itemsize
+        if width<19: raise ValueError("unrecognised timestamp format")
+        buf=chars.view(np.uint8).reshape(-1,width)
+
+        # separators & digits must be in fixed positions
+        for pos,sep in ((4,b"-"),(7,b"-"),(10,b"T"),(13,b":"),(16,b":")):
+            if (buf[:,pos]!=ord(sep)).any(): raise ValueError("unrecognised timestamp format")
+        digits=buf.astype(np.int64)-ord("0")
+        is_digit=(digits>=0)&(digits<=9)
+        if not is_digit[:,[0,1,2,3,5,6,8,9,11,12,14,15,17,18]].all(): raise ValueError("unrecognised timestamp format")
+        number=lambda start,end:sum(digits[:,i]*10**(end-i-1) for i in range(start,end))
+        seconds=self.__days_from_civil(number(0,4),number(5,7),number(8,10))*86400+number(11,13)*3600+number(14,16)*60+number(17,19)
+        ns=seconds*10**9
+
+        if (width==20) and (buf[:,19]==ord("Z")).all(): return ns # fast path: "YYYY-MM-DDTHH:MM:SSZ"
+
+        # timezone designator
+        rows=np.arange(len(raw))
+        lengths=np.char.str_len(chars)
+        is_z=buf[rows,lengths-1]==ord("Z")
+        offset_start=np.maximum(lengths-6,0)
+        has_offset=(lengths>=25)&np.isin(buf[rows,offset_start],[ord("+"),ord("-")])&(buf[rows,np.maximum(lengths-3,0)]==ord(":"))
+        if has_offset.any():
+            sign=np.where(buf[rows,offset_start]==ord("-"),-1,1)
+            offset=sign*(digits[rows,offset_start+1]*600+digits[rows,offset_start+2]*60+digits[rows,offset_start+4]*10+digits[rows,offset_start+5])
+            ns-=np.where(has_offset,offset,0)*60*10**9
+        fraction_end=lengths-np.where(is_z,1,np.where(has_offset,6,0))
+
+        # anything between the seconds & the zone must be a fraction ".fff", & offsets must be digits
+        has_fraction=(buf[:,19]==ord(".")) if width>19 else np.zeros(len(raw),dtype=bool)
+        positions=np.arange(width)
+        fraction_chars=has_fraction[:,None]&(positions>=20)&(positions<fraction_end[:,None])
+        valid=np.where(has_fraction,fraction_end>20,fraction_end==19)&(is_digit|~fraction_chars).all(axis=1)
+        valid&=~has_offset|is_digit[rows[:,None],offset_start[:,None]+[1,2,4,5]].all(axis=1)
+        if not valid.all(): raise ValueError("unrecognised timestamp format")
+
+        # fractional seconds (only first 9 digits are significant)
+        if width>20:
+            for pos in range(20,min(width,29)):
+                in_fraction=has_fraction&(pos<fraction_end)
+                ns+=np.where(in_fraction,digits[:,pos],0)*10**(28-pos)
+
+        return ns
+
+    def __days_from_civil(self,year:np.ndarray,month:np.ndarray,day:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        number of days between 1970-01-01 and each (proleptic gregorian) date.
+        see http://howardhinnant.github.io/date_algorithms.html#days_from_civil
+
+        PARAMETERS
+        year (numpy.ndarray): years
+        month (numpy.ndarray): months [1-12]
+        day (numpy.ndarray): days of month [1-31]
+
+        RETURNS
+        numpy.ndarray: days since epoch
+        """
+        year=year-(month<=2)
+        era=year//400
+        year_of_era=year-era*400
+        day_of_year=(153*np.where(month>2,month-3,month+9)+2)//5+day-1
+        day_of_era=year_of_era*365+year_of_era//4-year_of_era//100+day_of_year
+        return era*146097+day_of_era-719468
+
+    def __to_datetimes(self,ns:np.ndarray) -> [datetime]:
+        """
+        SUMMARY
+        convert epoch nanoseconds (from GPSReader.decode_times) to datetime objects
+
+        PARAMETERS
+        ns (numpy.ndarray): nanoseconds since the unix epoch
+
+        RETURNS
+        list(datetime.datetime): (naive, utc) datetime for each value
+        """
+        return ns.view("datetime64[ns]").astype("datetime64[us]").astype(object).tolist()
+
+
+    """
+    SCHEMA
+    """
+    def apply_schema(self,columns:dict) -> dict:
+        """
+        SUMMARY
+        Convert columnar data to the dtypes in GPSReader.SCHEMA.
+        Missing values in integer fields are replaced by the field's sentinel. Fields not in the schema are left unchanged.
+
+        PARAMETERS
+        columns (dict(str:numpy.ndarray)): values of each field, float64 with NaN for missing values (or int64 epoch nanoseconds for "time")
+
+        RETURNS
+        dict(str:numpy.ndarray): values of each field
+        """
+        converted={}
+        for name,values in columns.items():
+            if (name not in self.SCHEMA) or (values.dtype==self.SCHEMA[name][0]):
+                converted[name]=values
+                continue
+            dtype,missing=self.SCHEMA[name]
+            if np.issubdtype(dtype,np.floating): converted[name]=values.astype(dtype)
+            else:
+                limits=np.iinfo(dtype)
+                missing_values=np.isnan(values)|(values<limits.min)|(values>=missing) # out of range readings are treated as missing
+                converted[name]=np.where(missing_values,missing,np.rint(np.nan_to_num(values))).astype(dtype)
+        return converted
+
+    def missing(self,name:str,values:np.ndarray) -> np.ndarray:
+        """
+        SUMMARY
+        Which readings of a field are missing, according to GPSReader.SCHEMA
+
+        PARAMETERS
+        name (str): name of field
+        values (numpy.ndarray): values of field
+
+        RETURNS
+        numpy.ndarray: bool for each reading, True if missing
+        """
+        if np.issubdtype(values.dtype,np.floating): return np.isnan(values)
+        if name in self.SCHEMA: return values==self.SCHEMA[name][1]
+        return np.zeros(len(values),dtype=bool)
 
     def data_to_dataframe(self,data) -> pd.DataFrame:
         """
         SUMMARY
-        Convert data from GPSReader.read, GPSReader.read_gpx or GPSReader.read_tcx to pandas.DataFrame
+        Convert data from GPSReader.read, GPSReader.read_gpx or GPSReader.read_tcx to pandas.DataFrame, with the dtypes in GPSReader.SCHEMA
+        Columnar data (from GPSReader.read_gpx_columns or GPSReader.read_tcx_columns) is also accepted.
+
+        PARAMETERS
+	    parameter (list(dict)/dict(str:numpy.ndarray)): data from GPSReader.read, GPSReader.read_gpx or GPSReader.read_tcx
+
+        RETURNS
+	    pandas.DataFrame: dataframe for passed data
+        """
+        if isinstance(data,dict): return self.columns_to_dataframe(data)
+
+        columns={}
+        for name,values in pd.DataFrame(data).items():
+            if name=="time": columns[name]=pd.to_datetime(values).values.astype("datetime64[ns]").view(np.int64) # NaT is NAT
+            elif name in self.SCHEMA: columns[name]=values.values.astype(np.float64)
+            else: columns[name]=values.values
+        return self.columns_to_dataframe(self.apply_schema(columns))
+
+    def columns_to_dataframe(self,columns:dict) -> pd.DataFrame:
+        """
+        SUMMARY
+        Convert columnar data from GPSReader.read_gpx_columns or GPSReader.read_tcx_columns to pandas.DataFrame.
+        "time" is converted from epoch nanoseconds to datetime64[ns]. no per reading python objects are created.
 
         PARAMETERS
-	    parameter (list(dict)): data from GPSReader.read, GPSReader.read_gpx or GPSReader.read_tcx
+	    columns (dict(str:numpy.ndarray)): data from GPSReader.read_gpx_columns or GPSReader.read_tcx_columns
 
         RETURNS
 	    pandas.DataFrame: dataframe for passed data
         """
-        return pd.DataFrame(data)
+        frame={}
+        for name,values in columns.items():
+            frame[name]=values.view("datetime64[ns]") if name=="time" else values
+        return pd.DataFrame(frame)
+
+def read_dataframe(path:str,member=None,columns=None) -> (pd.DataFrame,dict):
+    """
+    SUMMARY
+    Parse a gps file into a pandas.DataFrame. run in worker processes by GPSReader.read_many (so is defined at module level)
+
+    PARAMETERS
+    path (str): path to file to read
+    member (str): name of file inside .zip archive at `path` (see GPSReader.read) (default=None)
+    columns (list(str)): names of fields to parse, see GPSReader.read (default=None)
+
+    RETURNS
+    pandas.DataFrame: data from GPSReader.read
+    dict: metadata from GPSReader.read
+    """
+    reader=GPSReader()
+    data,metadata=reader.read(path,columnar=True,member=member,columns=columns)
+    if data==-1: raise ValueError("unsupported file type")
+    return reader.columns_to_dataframe(data),metadata
 
 if __name__=="__main__":
     reader=GPSReader()
-    data,metadata=reader.read("../examples/example_ride.tcx")
+    data,metadata=reader.read("../examples/example_ride.tcx",columnar=True)
     df=reader.data_to_dataframe(data).head()
     print(df.dtypes)
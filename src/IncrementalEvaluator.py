@@ -0,0 +1,287 @@
+import numpy as np
+import pandas as pd
+
+from src.GPSReader import GPSReader,NAT
+from src.GPSEvaluator import GPSEvaluator
+
+# evaluates a route whose readings arrive a few at a time (eg from a live tracker), without re-evaluating earlier readings
+class IncrementalEvaluator:
+
+    def __init__(self,split_dist=1000,sampling_dist=100,bin_width=10,distance_method="vincenty"):
+        """
+        SUMMARY
+        Keeps the readings of a route, with their "distance", "cumm_distance" & "seconds" (see GPSEvaluator), completed splits & histogram counts.
+        Each call to IncrementalEvaluator.append only evaluates the new readings, continuing from the last reading kept.
+        Results match GPSEvaluator on the whole route.
+
+        PARAMETERS
+        split_dist (int): length of split in metres, see IncrementalEvaluator.splits (default=1000)
+        sampling_dist (int): how often in metres to sample for histograms, see GPSEvaluator.split_histogram_data (default=100)
+        bin_width (int): width of histogram bin in seconds for seconds per km split (default=10)
+        distance_method (str): distance model, see GPSEvaluator.distance (default="vincenty")
+        """
+        if split_dist<=0 or sampling_dist<=0: raise ValueError("split_dist & sampling_dist must be positive")
+        if distance_method not in GPSEvaluator.DISTANCE_METHODS: raise ValueError("unknown distance method {}, use one of {}".format(distance_method,list(GPSEvaluator.DISTANCE_METHODS)))
+        self.split_dist=split_dist
+        self.sampling_dist=sampling_dist
+        self.bin_width=bin_width
+        self.distance_method=distance_method
+
+        self.__reader=GPSReader()
+        self.__length=0 # number of readings kept
+        self.__columns={} # name mapped to array of values. arrays have spare capacity beyond `__length`, doubled when full
+        self.__total_dist=0 # distance covered (not rounded, so sums match GPSEvaluator.cumm_distance)
+        self.__last_reached=None # (furthest cumm distance, seconds at last reading with a distance & time), where the next splits continue from
+        self.__first_time=None # epoch nanoseconds of first time, which seconds are counted from
+        self.__splits={self.split_dist:self.__new_splits(),self.sampling_dist:self.__new_splits()} # split distance mapped to completed splits
+        self.__bins={} # lower bound of bin mapped to number of sampled splits in bin
+        self.__bins_per_km={} # (km,lower bound of bin) mapped to number of sampled splits in bin
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def append(self,points):
+        """
+        SUMMARY
+        Add readings to the end of the route, evaluating only the new readings.
+        Readings must be in chronological order, & after every reading already appended.
+
+        PARAMETERS
+        points (pandas.DataFrame/dict(str:numpy.ndarray)/list(dict)): new readings, in any form GPSReader.data_to_dataframe accepts (or a dataframe from it)
+        """
+        df=points if isinstance(points,pd.DataFrame) else self.__reader.data_to_dataframe(points)
+        if len(df)==0: return
+        start=self.__length
+
+        for name in df.columns:
+            values=df[name].values
+            if name=="time": values=pd.to_datetime(df[name]).values.astype("datetime64[ns]").view(np.int64)
+            self.__store(name,values,start)
+        for name in self.__columns: # fields missing from the new readings
+            if name not in df.columns and name not in ("distance","cumm_distance","seconds"): self.__store(name,self.__missing(name,len(df)),start)
+        self.__length+=len(df)
+
+        if "position_lat" in self.__columns and "position_lon" in self.__columns: self.__append_distances(start)
+        if "time" in self.__columns: self.__append_seconds(start)
+        if "cumm_distance" in self.__columns and "seconds" in self.__columns: self.__append_splits(start)
+
+    """
+    SNAPSHOTS
+    """
+
+    def snapshot(self) -> pd.DataFrame:
+        """
+        SUMMARY
+        Readings appended so far, with "distance", "cumm_distance" & "seconds" columns (where data allows).
+        Columns are views of the kept arrays (no copying), so the snapshot can be passed straight to SVGMaker or Activity.
+        Later calls to IncrementalEvaluator.append don't change a snapshot already taken.
+
+        RETURNS
+        pandas.DataFrame: readings, in the form GPSReader.data_to_dataframe produces
+        """
+        n=self.__length
+        frame={}
+        for name,values in self.__columns.items():
+            values=values[:n]
+            if name=="time": values=values.view("datetime64[ns]")
+            elif name=="seconds" and not np.isnan(values).any(): values=values.astype(np.int64) # matches GPSEvaluator.time_to_seconds
+            frame[name]=values
+        return pd.DataFrame(frame,copy=False)
+
+    def splits(self,split_dist=None) -> pd.DataFrame:
+        """
+        SUMMARY
+        Time taken for each completed split, see GPSEvaluator.splits
+
+        PARAMETERS
+        split_dist (int): length of split in metres. only `split_dist` & `sampling_dist` given to the constructor are kept.
+                          pass `None` for `split_dist` given to the constructor (default=None)
+
+        RETURNS
+        pandas.DataFrame: "dist" & "time" of each split (None if insufficient data)
+        """
+        split_dist=self.split_dist if split_dist is None else split_dist
+        if split_dist not in self.__splits: raise ValueError("splits are only kept for {} & {}".format(self.split_dist,self.sampling_dist))
+        if "cumm_distance" not in self.__columns or "seconds" not in self.__columns: return None # not enough data
+        kept=self.__splits[split_dist]
+        return pd.DataFrame({"dist":np.array(kept["dist"]) if len(kept["dist"])>0 else np.empty(0,dtype=np.int64),"time":np.array(kept["time"],dtype=np.float64)})
+
+    def split_histogram_data(self,clean=False) -> pd.Series:
+        """
+        SUMMARY
+        Histogram of split times, see GPSEvaluator.split_histogram_data. built from the counts kept, so doesn't depend on the length of the route.
+
+        PARAMETERS
+        clean (bool): remove extreme data (default=False)
+
+        RETURNS
+        pandas.Series: count of samples falling in each bin (None if insufficient data)
+        """
+        if "cumm_distance" not in self.__columns or "seconds" not in self.__columns: return None # not enough data
+        if len(self.__bins)==0: bins_ser=pd.Series(np.empty(0,dtype=np.int64),index=np.empty(0,dtype=np.int64))
+        else:
+            lower_bounds=np.arange(min(self.__bins),max(self.__bins)+1,self.bin_width)
+            bins_ser=pd.Series([self.__bins.get(lower,0) for lower in lower_bounds.tolist()],index=lower_bounds,dtype=np.int64)
+        if clean: return GPSEvaluator.clean_histogram_data(bins_ser)
+        return bins_ser
+
+    def split_histogram_data_per_km(self,clean=False) -> pd.DataFrame:
+        """
+        SUMMARY
+        Histogram of split times for each km, see GPSEvaluator.split_histogram_data_per_km. built from the counts kept.
+
+        PARAMETERS
+        clean (bool): remove extreme data (default=False)
+
+        RETURNS
+        pandas.DataFrame: column for each km, row for each bin (None if insufficient data)
+        """
+        if (1000%self.sampling_dist!=0): return None # non-equal samples per km
+        if "cumm_distance" not in self.__columns or "seconds" not in self.__columns: return None # not enough data
+        num_kms=len(self.__splits[self.sampling_dist]["time"])//(1000//self.sampling_dist)
+        columns=["km_{}".format(i+1) for i in range(num_kms+1)]
+        if len(self.__bins_per_km)==0: return pd.DataFrame(np.empty((0,num_kms+1),dtype=np.int64),index=np.empty(0,dtype=np.int64),columns=columns)
+
+        lower_bounds=np.arange(min(self.__bins),max(self.__bins)+1,self.bin_width)
+        counts=np.zeros((len(lower_bounds),num_kms+1),dtype=np.int64)
+        for (km,lower),count in self.__bins_per_km.items(): counts[(lower-lower_bounds[0])//self.bin_width,km]=count
+        split_df=pd.DataFrame(counts,index=lower_bounds,columns=columns)
+        if clean: return GPSEvaluator.clean_histogram_data_per_km(split_df)
+        return split_df
+
+    """
+    EVALUATE NEW READINGS
+    """
+
+    def __append_distances(self,start:int):
+        """
+        SUMMARY
+        Calculate "distance" & "cumm_distance" of readings from `start`, continuing from the reading before `start`
+
+        PARAMETERS
+        start (int): index of first new reading
+        """
+        if "distance" not in self.__columns: start=0 # position first known now, so evaluate every reading
+        lat=self.__columns["position_lat"][start:self.__length]; lon=self.__columns["position_lon"][start:self.__length]
+        prev_point=(self.__columns["position_lat"][start-1],self.__columns["position_lon"][start-1]) if start>0 else None
+        distances=GPSEvaluator.distance(pd.DataFrame({"position_lat":lat,"position_lon":lon}),prev_point=prev_point,method=self.distance_method).values
+
+        totals=np.cumsum(np.concatenate([[self.__total_dist],np.nan_to_num(distances)]))[1:] # continues sum in the same order as GPSEvaluator.cumm_distance
+        self.__total_dist=totals[-1]
+        self.__store("distance",distances,start)
+        self.__store("cumm_distance",np.where(np.isnan(distances),np.nan,np.round(totals,2)),start)
+
+    def __append_seconds(self,start:int):
+        """
+        SUMMARY
+        Calculate "seconds" of readings from `start`, counted from the first time appended (see GPSEvaluator.time_to_seconds)
+
+        PARAMETERS
+        start (int): index of first new reading
+        """
+        if "seconds" not in self.__columns: start=0 # times first known now
+        ns=self.__columns["time"][start:self.__length]
+        present=ns!=NAT
+        if self.__first_time is None and present.any(): self.__first_time=ns[present][0]
+        first=self.__first_time if self.__first_time is not None else 0
+        seconds=np.where(present,(ns-first)//10**9,np.nan) if self.__first_time is not None else np.full(len(ns),np.nan)
+        self.__store("seconds",seconds,start)
+
+    def __append_splits(self,start:int):
+        """
+        SUMMARY
+        Find splits completed by readings from `start` (for `split_dist` & `sampling_dist`) & count the new sampled splits in their histogram bins
+
+        PARAMETERS
+        start (int): index of first new reading
+        """
+        if self.__last_reached is None: start=0 # no splits can have been evaluated yet (eg times first known now)
+        cumm_dists=self.__columns["cumm_distance"][start:self.__length]; seconds=self.__columns["seconds"][start:self.__length]
+        after_dist=0
+        if self.__last_reached is not None: # continue from the last reading with a distance & time
+            after_dist=self.__last_reached[0]
+            cumm_dists=np.concatenate([[self.__last_reached[0]],cumm_dists]); seconds=np.concatenate([[self.__last_reached[1]],seconds])
+
+        present=np.flatnonzero(~np.isnan(cumm_dists)&~np.isnan(seconds)) # see GPSEvaluator.crossings
+        if len(present)==0: return
+        self.__last_reached=(max(after_dist,cumm_dists[present].max()),seconds[present[-1]])
+
+        for split_dist,kept in self.__splits.items():
+            boundaries,times=GPSEvaluator.crossings(cumm_dists,seconds,split_dist,after_dist=after_dist)
+            if len(boundaries)==0: continue
+            split_times=np.diff(times,prepend=kept["last_time"])
+            first_split=len(kept["time"])
+            kept["dist"].extend(boundaries.tolist()); kept["time"].extend(split_times.tolist()); kept["last_time"]=times[-1]
+
+            if split_dist==self.sampling_dist: # sampled splits are histogram data (see GPSEvaluator.split_histogram_data)
+                timed=np.flatnonzero(~np.isnan(split_times)) # splits without times (missing readings) can't be binned
+                lower_bounds=(np.floor_divide((split_times[timed]*(1000/self.sampling_dist)).astype(int),self.bin_width)*self.bin_width).tolist()
+                kms=((first_split+timed)//max(1000//self.sampling_dist,1)).tolist()
+                for km,lower in zip(kms,lower_bounds):
+                    self.__bins[lower]=self.__bins.get(lower,0)+1
+                    self.__bins_per_km[(km,lower)]=self.__bins_per_km.get((km,lower),0)+1
+
+    """
+    STORAGE
+    """
+
+    def __new_splits(self) -> dict:
+        """
+        RETURNS
+        dict: completed splits for one split distance. "dist" & "time" of each split & "last_time" (seconds when last boundary was crossed)
+        """
+        return {"dist":[],"time":[],"last_time":0}
+
+    def __store(self,name:str,values:np.ndarray,start:int):
+        """
+        SUMMARY
+        Write values of a column from index `start`, growing its array if needed.
+        capacity is doubled when full, so appending n readings one at a time copies O(n) values in total.
+
+        PARAMETERS
+        name (str): name of column
+        values (numpy.ndarray): values from `start`
+        start (int): index of first value
+        """
+        end=start+len(values)
+        if name not in self.__columns: # new column, earlier readings are missing
+            column=self.__missing(name,max(end,16),dtype=values.dtype)
+        else:
+            column=self.__columns[name]
+            dtype=np.result_type(column.dtype,values.dtype) if name!="time" else np.int64
+            if dtype!=column.dtype: column=column.astype(dtype) # eg float32 altitude followed by float64
+            if end>len(column):
+                grown=self.__missing(name,max(end,2*len(column)),dtype=column.dtype)
+                grown[:start]=column[:start]
+                column=grown
+        column[start:end]=values
+        self.__columns[name]=column
+
+    def __missing(self,name:str,length:int,dtype=None) -> np.ndarray:
+        """
+        SUMMARY
+        Array of missing values for a column, using the sentinels in GPSReader.SCHEMA
+
+        PARAMETERS
+        name (str): name of column
+        length (int): length of array
+        dtype (numpy.dtype): dtype of array. pass `None` for the column's current dtype (default=None)
+
+        RETURNS
+        numpy.ndarray: missing values
+        """
+        dtype=np.dtype(dtype if dtype is not None else self.__columns[name].dtype)
+        if name=="time": return np.full(length,NAT,dtype=np.int64)
+        if np.issubdtype(dtype,np.floating): return np.full(length,np.nan,dtype=dtype)
+        if name in GPSReader.SCHEMA and np.can_cast(np.min_scalar_type(GPSReader.SCHEMA[name][1]),dtype): return np.full(length,GPSReader.SCHEMA[name][1],dtype=dtype)
+        return np.zeros(length,dtype=dtype)
+
+if __name__=="__main__":
+    reader=GPSReader()
+    data,metadata=reader.read("../examples/example_run.gpx",columnar=True)
+    df=reader.data_to_dataframe(data)
+    evaluator=IncrementalEvaluator()
+    for start in range(0,len(df),50): # as if streamed from a tracker
+        evaluator.append(df.iloc[start:start+50])
+        print(len(evaluator),evaluator.snapshot()["cumm_distance"].iloc[-1],len(evaluator.splits()))
+    print(evaluator.split_histogram_data(clean=True))
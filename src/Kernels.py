@@ -0,0 +1,88 @@
+import numpy as np
+
+"""
+Compiled versions of the sequential kernels in GPSEvaluator, used when numba (https://numba.pydata.org) is installed.
+numba is optional. without it GPSEvaluator uses its numpy implementations, which give the same results.
+Kernels are defined at module level (not in a class) so numba can compile them. each is compiled on first use & cached to disk.
+"""
+
+try:
+    from numba import njit
+except ImportError: # numba not installed, GPSEvaluator.BACKENDS is only "numpy"
+    njit=None
+
+AVAILABLE=njit is not None
+
+if AVAILABLE:
+
+    @njit(cache=True)
+    def hysteresis(values:np.ndarray,threshold:float) -> np.ndarray:
+        """
+        SUMMARY
+        Follow `values`, only moving once they are more than `threshold` away, in one pass. see GPSEvaluator.__hysteresis
+
+        PARAMETERS
+        values (numpy.ndarray): float64 values without NaN
+        threshold (float): distance values must move before output changes
+
+        RETURNS
+        numpy.ndarray: output for each value
+        """
+        output=np.empty(len(values))
+        if len(values)==0: return output
+        current=values[0]
+        for i in range(len(values)):
+            current=min(max(current,values[i]-threshold),values[i]+threshold)
+            output[i]=current
+        return output
+
+    @njit(cache=True)
+    def __interpolate(cumm_dists:np.ndarray,values:np.ndarray,target:float,before:int,after:int) -> float:
+        """
+        SUMMARY
+        Linearly interpolate a value at a distance between two readings. see GPSEvaluator.__interpolate (same arithmetic, so results are identical)
+        """
+        gap=cumm_dists[after]-cumm_dists[before]
+        fraction=(target-cumm_dists[before])/gap if gap>0 else 1.0
+        return values[before]+fraction*(values[after]-values[before])
+
+    @njit(cache=True)
+    def best_effort(cumm_dists:np.ndarray,seconds:np.ndarray,dist:float) -> (float,int,int):
+        """
+        SUMMARY
+        Fastest window covering `dist`, sliding both ends of the window along the readings (two pointers) in O(n). see GPSEvaluator.__best_effort
+
+        PARAMETERS
+        cumm_dists (numpy.ndarray): non-decreasing cummulative distance of each reading (covering at least `dist`)
+        seconds (numpy.ndarray): seconds at each reading, without NaN
+        dist (float): positive distance in metres
+
+        RETURNS
+        float: fastest time in seconds
+        int: index of first reading in fastest window
+        int: index of last reading in fastest window
+        """
+        n=len(cumm_dists)
+
+        # windows starting on a reading, ending at the first time `dist` further is reached
+        best_start=np.inf; start=0; start_end=0
+        after=0
+        for i in range(n):
+            target=cumm_dists[i]+dist
+            if target>cumm_dists[n-1]: break
+            while cumm_dists[after]<target: after+=1 # first reading at or beyond end of window
+            taken=__interpolate(cumm_dists,seconds,target,after-1,after)-seconds[i]
+            if taken<best_start: best_start=taken; start=i; start_end=after
+
+        # windows ending on a reading, starting at the last time `dist` before is left
+        best_end=np.inf; end_start=0; end=0
+        before=0
+        for j in range(n):
+            target=cumm_dists[j]-dist
+            if target<cumm_dists[0]: continue
+            while before+1<n and cumm_dists[before+1]<=target: before+=1 # last reading at or before start of window
+            taken=seconds[j]-__interpolate(cumm_dists,seconds,target,before,before+1)
+            if taken<best_end: best_end=taken; end_start=before; end=j
+
+        if best_start<=best_end: return best_start,start,start_end
+        return best_end,end_start,end
@@ -6,6 +6,7 @@
     Text position options (On axis, on tip of bar, in bar)
     Tool tips (title on svg rect)
 """
+from src.Activity import Activity
 from src.GPSReader import GPSReader
 from src.GPSEvaluator import GPSEvaluator
 from math import ceil
@@ -257,7 +258,8 @@ class ElevationStyler(RouteStyler):
         animated=False,animation_length=10,num_dashes=2,dash_colour="#547358",
         split_dist=None,split_marker_colour="#000",split_marker_width=5,
         start_marker=False,start_marker_colour="green",start_marker_width=5,
-        finish_marker=False,finish_marker_colour="red",finish_marker_width=5):
+        finish_marker=False,finish_marker_colour="red",finish_marker_width=5,
+        smoothing=None):
         super().__init__(border_width,path_colour,fill_colour,path_width,path_linejoin,
             animated,animation_length,num_dashes,dash_colour,
             split_dist,split_marker_colour,split_marker_width,
@@ -272,9 +274,11 @@ class ElevationStyler(RouteStyler):
         PARAMETERS
         see RouteStyler
         plinth_height (int): heigh of plinth. gap between lowest point and bottom of plot. (default=30)
+        smoothing (str): filter which removes altitude noise before plotting, see GPSEvaluator.smooth_altitude. pass `None` to plot raw altitude. (default=None)
         """
 
         self.plinth_height=plinth_height # set to None for no plinth
+        self.smoothing=smoothing
 
 class SVGMaker:
 
@@ -546,11 +550,11 @@ class SVGMaker:
         # check data exists
         if "cumm_distance" in df: elevation_df=df[["cumm_distance","altitude"]].copy(deep=True) # data to be used
         elif ("position_lat" in df.columns) and ("position_lon" in df.columns):
-            df["cumm_distance"]=GPSEvaluator.cumm_distance(df)
-            elevation_df=df[["cumm_distance","altitude"]].copy(deep=True)
+            elevation_df=pd.DataFrame({"cumm_distance":GPSEvaluator.cumm_distance(df),"altitude":df["altitude"]}) # `df` is left unchanged
         else: return None # not enough data
 
         if (elevation_styler is None): elevation_styler=ElevationStyler() # ensure styler exists
+        if (elevation_styler.smoothing is not None): elevation_df["altitude"]=GPSEvaluator.smooth_altitude(elevation_df,method=elevation_styler.smoothing).values
 
         # scale values for plot
         scaling={}
@@ -1082,7 +1086,7 @@ class DefaultStylers:
     simple_elevation=ElevationStyler(plinth_height=None,fill_colour=None,animated=False)
 
 # to_plot pass a tuple containing (styler,output_name)
-def plot_all(file_path:str,plot_html=True,html_output_name="test/many_examples",to_plot={"route":(None,"test/route"),"elevation":(None,"test/elevation"),"histogram":(None,"test/hist"),"animated_histogram":(None,"test/animated_hist")},path_to_remove="test/") -> str:
+def plot_all(file_path:str,plot_html=True,html_output_name="test/many_examples",to_plot={"route":(None,"test/route"),"elevation":(None,"test/elevation"),"histogram":(None,"test/hist"),"animated_histogram":(None,"test/animated_hist")},path_to_remove="test/",cache=None) -> str:
     """
     SUMMARY
     parses a gps file and generates specified svgs for it
@@ -1096,39 +1100,51 @@ def plot_all(file_path:str,plot_html=True,html_output_name="test/many_examples",
                                        for values define a tuple (Styler,output_name of generated files). Pass `None` for Styler to use default.
                                        (default={"route":(None,"test/route"),"elevation":(None,"test/elevation"),"histogram":(None,"test/hist"),"animated_histogram":(None,"test/animated_hist")})
    path_to_remove (str): string to remove start of file names in `to_plot` to ensure they are correctly defined relative to html file being generated. (default="test/")
+    cache (ActivityCache): cache to read parsed data from, so files aren't re-parsed each time they are plotted. pass `None` to always parse file. (default=None)
 
     RETURNS
 	str: IF (plot_html): relative path to generated html file
     list(dict): IF (not plot_html): list of dicts specifying files generated for each svg
     """
-    reader=GPSReader()
-    data,metadata=reader.read(file_path)
-    df=reader.data_to_dataframe(data)
+    if cache is not None:
+        df,metadata=cache.read(file_path)
+    else:
+        columns=["position_lat","position_lon"] # only parse fields used by requested plots
+        if "elevation" in to_plot: columns.append("altitude")
+        if ("histogram" in to_plot) or ("animated_histogram" in to_plot): columns.append("time")
+        reader=GPSReader()
+        data,metadata=reader.read(file_path,columnar=True,columns=columns)
+        df=reader.data_to_dataframe(data)
+
+    # derived data is calculated once & shared by every plot
+    activity=Activity(df,metadata)
+    with_distance=activity.frame(list(dict.fromkeys(list(df.columns)+["cumm_distance"])))
+    if with_distance is None: with_distance=df # insufficient data, plots will report it
 
     files=[]
     if "route" in to_plot:
         plot_details=to_plot["route"]
         styler=RouteStyler() if (plot_details[0] is None) else plot_details[0]
-        new_files=SVGMaker.generate_route_svg(df,route_styler=styler,output_name=plot_details[1])
+        new_files=SVGMaker.generate_route_svg(with_distance,route_styler=styler,output_name=plot_details[1])
         files.append(new_files)
 
     if "elevation" in to_plot:
         plot_details=to_plot["elevation"]
         styler=ElevationStyler() if (plot_details[0] is None) else plot_details[0]
-        new_files=SVGMaker.generate_elevation_svg(df,elevation_styler=styler,output_name=plot_details[1])
+        new_files=SVGMaker.generate_elevation_svg(with_distance,elevation_styler=styler,output_name=plot_details[1])
         files.append(new_files)
 
     if "histogram" in to_plot:
         plot_details=to_plot["histogram"]
         styler=HistogramStyler() if (plot_details[0] is None) else plot_details[0]
-        hist_data=GPSEvaluator.split_histogram_data(df,clean=True)
+        hist_data=activity.split_histogram_data(clean=True)
         new_files=new_files=SVGMaker.generate_histogram(hist_data,hist_styler=styler,output_name=plot_details[1])
         files.append(new_files)
 
     if "animated_histogram" in to_plot:
         plot_details=to_plot["animated_histogram"]
         styler=HistogramStyler() if (plot_details[0] is None) else plot_details[0]
-        hist_data_per_km=GPSEvaluator.split_histogram_data_per_km(df,clean=True)
+        hist_data_per_km=activity.split_histogram_data_per_km(clean=True)
         new_files=SVGMaker.generate_animated_histogram(hist_data_per_km,hist_styler=styler,output_name=plot_details[1])
         files.append(new_files)
 